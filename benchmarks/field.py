@@ -0,0 +1,67 @@
+"""Generic `%` vs shift-and-add reduction for the field presets.
+
+    $ python -m benchmarks.field
+"""
+from contextlib import contextmanager
+import random
+import time
+
+from secret_sharing import Configuration
+from secret_sharing import field as fields
+
+
+def timed(f, repeat=5) -> float:
+    best = float("inf")
+    for _ in range(repeat):
+        start = time.perf_counter()
+        f()
+        best = min(best, time.perf_counter() - start)
+    return best
+
+
+@contextmanager
+def reduction(field: fields.Field):
+    preset = fields._BY_MODULUS[field.modulus]
+    fields._BY_MODULUS[field.modulus] = field
+    fields.field_for.cache_clear()
+    try:
+        yield
+    finally:
+        fields._BY_MODULUS[field.modulus] = preset
+        fields.field_for.cache_clear()
+
+
+def shift_and_add(modulus: int) -> fields.Field:
+    bits = modulus.bit_length()
+    if modulus == (1 << bits) - 1:
+        return fields.MersenneField(bits)
+    return fields.PseudoMersenneField(bits, (1 << bits) - modulus)
+
+
+def bench(name: str) -> tuple[float, float, float]:
+    # split_batch is left out: drawing the random values dominates it.
+    conf = Configuration(modulo=name, formula=f"T20({', '.join(f'p{i}' for i in range(30))}) & T3(a, b, c, d)")
+    plan = conf.plan()
+    batch = plan.split_batch(range(20000), seed=0)
+    parts = conf.split(42, seed=0)
+    rng = random.Random(0)
+    p = conf.modulo
+    sums = [sum(rng.randrange(p) * rng.randrange(p) for _ in range(20)) for _ in range(20000)]
+    return (
+        timed(lambda: conf.field.reduce_many(sums)),
+        timed(lambda: plan.restore_batch(batch)),
+        timed(lambda: [conf.restore(parts) for _ in range(20)]),
+    )
+
+
+def main():
+    print(f"{'field':>12} {'reduction':>10} {'reduce_many':>12} {'restore_batch':>14} {'restore x20':>12}")
+    for name, field in fields.FIELDS.items():
+        for kind, candidate in (("generic", fields.Field(field.modulus)), ("shift-add", shift_and_add(field.modulus))):
+            with reduction(candidate):
+                reduce_many, restore_batch, restore = bench(name)
+                print(f"{name:>12} {kind:>10} {reduce_many:>12.4f} {restore_batch:>14.4f} {restore:>12.4f}")
+
+
+if __name__ == "__main__":
+    main()
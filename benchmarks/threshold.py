@@ -0,0 +1,74 @@
+"""Naive vs subproduct tree split/restore of large threshold nodes.
+
+    $ python -m benchmarks.threshold
+
+Prints timings for `T{k}` of `2k` participants and the smallest `k` from which
+the fast split and the fast restore keep winning, which is what
+`poly.FAST_SPLIT_THRESHOLD` and `poly.FAST_RESTORE_THRESHOLD` should be set to.
+Re-run it whenever either the quadratic or the fast path changes.
+"""
+import random
+import sys
+import time
+
+from secret_sharing import Configuration, poly
+from secret_sharing.poly import _kronecker, ntt_mul, range_tree
+
+MODULO = 2**127 - 1
+NTT_MODULO = 998244353
+
+
+def timed(f, repeat=5) -> float:
+    best = float("inf")
+    for _ in range(repeat):
+        start = time.perf_counter()
+        f()
+        best = min(best, time.perf_counter() - start)
+    return best
+
+
+def bench_threshold(k: int, cutoff: int) -> tuple[float, float]:
+    poly.FAST_SPLIT_THRESHOLD = poly.FAST_RESTORE_THRESHOLD = cutoff
+    range_tree.cache_clear()
+    engine = Configuration(modulo=MODULO, formula=f"T{k}({', '.join(f'p{i}' for i in range(2 * k))})").engine()
+    parts = engine.split(42, seed=0)
+    split = timed(lambda: engine.split(42, seed=0))
+    restore = timed(lambda: engine.restore(parts[:k]))
+    return split, restore
+
+
+def crossover(sizes, naive, fast):
+    """Smallest size from which the fast path is faster at every larger size."""
+    result = None
+    for k, a, b in zip(sizes, naive, fast):
+        if b >= a:
+            result = None
+        elif result is None:
+            result = k
+    return result
+
+
+def main(sizes=(64, 128, 192, 256, 384, 512, 768, 1024)):
+    split_cutoff, restore_cutoff = poly.FAST_SPLIT_THRESHOLD, poly.FAST_RESTORE_THRESHOLD
+    timings = []
+    print(f"{'k':>6} {'split naive':>12} {'split fast':>12} {'restore naive':>14} {'restore fast':>13}")
+    for k in sizes:
+        split_naive, restore_naive = bench_threshold(k, cutoff=sys.maxsize)
+        split_fast, restore_fast = bench_threshold(k, cutoff=0)
+        timings.append((split_naive, split_fast, restore_naive, restore_fast))
+        print(f"{k:>6} {split_naive:>12.4f} {split_fast:>12.4f} {restore_naive:>14.4f} {restore_fast:>13.4f}")
+    poly.FAST_SPLIT_THRESHOLD, poly.FAST_RESTORE_THRESHOLD = split_cutoff, restore_cutoff
+    columns = list(zip(*timings))
+    print(f"split crossover: k = {crossover(sizes, columns[0], columns[1])}")
+    print(f"restore crossover: k = {crossover(sizes, columns[2], columns[3])}")
+
+    print(f"\n{'n':>6} {'ntt':>10} {'kronecker':>10}")
+    for n in (256, 1024, 4096):
+        a = [random.randrange(NTT_MODULO) for _ in range(n)]
+        b = [random.randrange(NTT_MODULO) for _ in range(n)]
+        print(f"{n:>6} {timed(lambda: ntt_mul(a, b, NTT_MODULO)):>10.4f} "
+              f"{timed(lambda: _kronecker(a, b, NTT_MODULO)):>10.4f}")
+
+
+if __name__ == "__main__":
+    main()
@@ -4,8 +4,12 @@ from typing import Any, TypeVar
 import json
 from base64 import urlsafe_b64decode, urlsafe_b64encode
 
+from .__version__ import __version__
 from .parse import parse
 from .boolean import BooleanNode, NodeKind
+from .field import FIELDS, Field, field_for
+from . import poly as _poly
+from .poly import batch_inverse, interpolate, multipoint_eval, poly_eval, range_tree, rs_decode
 import secrets
 import random
 
@@ -33,6 +37,17 @@ class Configuration:
     formula: str
     version: int = 1
 
+    def __post_init__(self) -> None:
+        if isinstance(self.modulo, str):
+            if self.modulo not in FIELDS:
+                raise ValueError(f"unknown field preset {self.modulo!r}, expected one of {', '.join(FIELDS)}")
+            self.modulo = FIELDS[self.modulo].modulus
+        field_for(self.modulo)
+
+    @property
+    def field(self) -> Field:
+        return field_for(self.modulo)
+
     def serialize(self) -> str:
         data = {"modulo": self.modulo, "formula": self.formula, "version": self.version}
         return urlsafe_b64encode(json.dumps(data, ensure_ascii=False).encode("utf-8"))
@@ -43,6 +58,11 @@ class Configuration:
         return cls(modulo=data["modulo"], formula=data["formula"], version=data["version"])
 
     def make_formula(self) -> BooleanNode:
+        if (cache := default_cache()) is not None:
+            return cache.formula(self)
+        return self._make_formula()
+
+    def _make_formula(self) -> BooleanNode:
         formula: BooleanNode = parse(self.formula)
         counter = Counter()
 
@@ -64,29 +84,56 @@ class Configuration:
         parse(self.formula).walk(walker)
         return result
 
+    def engine(self) -> "Engine":
+        """Compile the configuration once for repeated and concurrent use."""
+        return Engine(self)
+
     def split(self, secret: int, seed=None, assigned=None) -> list[Part]:
-        formula = self.make_formula()
-        secret %= self.modulo
-        splitter = Splitter(self, seed=seed, assigned=assigned)
-        splitter.split(secret, formula)
-        split = list(splitter.assigned.items())
-        split.sort(key=lambda x: x[0][1])
-        result = {}
-        for key, val in split:
-            name, idx = key
-            if name not in result:
-                result[name] = Part(name, [])
-            assert idx - 1 == len(result[name].values)
-            result[name].values.append(val)
-        return list(result.values())
-
-    def restore(self, parts: list[Part]) -> int | None:
-        formula = self.make_formula()
-        given = {}
-        for part in parts:
-            for idx, val in enumerate(part.values, 1):
-                given[(part.name, idx)] = val
-        return Restorer(self, given).restore(formula)
+        return Engine(self).split(secret, seed=seed, assigned=assigned)
+
+    def split_committed(self, secret: int, seed=None, bits: int = 2048) -> tuple[list[Part], "Commitments"]:
+        """Split the secret and commit to every threshold polynomial in a `bits`-bit group.
+
+        The commitments only hide the secret for a modulo of at least `vss.MIN_ORDER` (2^200).
+        """
+        return Engine(self).split_committed(secret, seed=seed, bits=bits)
+
+    def restore(self, parts: "list[Part] | SecretView") -> int | None:
+        return Engine(self).restore(parts)
+
+    def split_packed(self, secrets: list[int], seed=None) -> list[Part]:
+        """Split several secrets at once, packing all of them into every threshold polynomial.
+
+        A threshold node `Tk` holding `L` packed secrets still needs `k` children to
+        restore, but only hides the secrets from up to `k - L` of them, so `L` must be
+        below every threshold. Every variable must be below some threshold node.
+
+        The shares don't record `L`: it is public and has to be kept with them, as
+        `restore_packed` needs it back.
+        """
+        return Engine(self).split_packed(secrets, seed=seed)
+
+    def restore_packed(self, parts: "list[Part] | SecretView", count: int) -> list[int] | None:
+        """Restore the `count` secrets of `split_packed`, which must be the number that was split."""
+        return Engine(self).restore_packed(parts, count)
+
+    def restore_verified(self, parts: "list[Part] | SecretView") -> tuple[int | None, set[str]]:
+        """Restore the secret, correcting corrupted shares where threshold nodes have spare ones.
+
+        Also returns names of participants whose shares fed an inconsistent child of a
+        threshold node. Gives `None` if a node has more errors than it can correct.
+        """
+        return Engine(self).restore_verified(parts)
+
+    def plan(self) -> "SplitPlan":
+        """Compiled batch plan, memoized per configuration with its recombination vectors."""
+        return Engine.shared(self).plan
+
+    def split_batch(self, secrets: list[int], seed=None) -> "PartBatch":
+        return self.plan().split_batch(secrets, seed=seed)
+
+    def restore_batch(self, batch: "PartBatch | list[list[Part]]") -> list[int | None]:
+        return self.plan().restore_batch(batch)
 
     def modify(self, new: "Configuration", parts: list[Part], seed: int = None):
         secret = self.restore(parts)
@@ -106,6 +153,10 @@ class Configuration:
         print(assigned)
         return new.split(secret, seed=seed, assigned=assigned)
 
+    def modify_delta(self, new: "Configuration", parts: list[Part], seed: int = None) -> "ShareDelta":
+        """Like `modify`, but only the shares that have to be redistributed."""
+        return ShareDelta.compute(self, new, parts, self.modify(new, parts, seed=seed))
+
 
 class MathBase:
     def __init__(self, conf: Configuration, seed=None) -> None:
@@ -116,6 +167,10 @@ class MathBase:
     def mod(self) -> int:
         return self.conf.modulo
 
+    @property
+    def field(self) -> Field:
+        return field_for(self.conf.modulo)
+
     def rand(self, n=None) -> int | list[int]:
         if n is None:
             if self._rng:
@@ -125,20 +180,14 @@ class MathBase:
         return [self.rand() for _ in range(n)]
 
     def inv(self, n: int) -> int:
-        n, m = n % self.mod, self.mod
-        x, y = 1, 0
-        while n > 1:
-            q = n // m
-            n, m = m, n % m
-            x, y = y, x - q * y
-
-        return x % self.mod
+        return self.field.inv(n)
 
 
 class Splitter(MathBase):
     def __init__(self, conf: Configuration, assigned: dict[Any, int] = None, **kwargs) -> None:
         super().__init__(conf, **kwargs)
-        self.assigned = assigned or {}
+        self.assigned = dict(assigned or {})
+        self.polys: dict[BooleanNode, list[int]] = {}  # threshold node -> coefficients
 
     def _assign(self, key: Any, val: int, is_random: bool):
         if is_random and key in self.assigned:
@@ -149,14 +198,7 @@ class Splitter(MathBase):
         self.assigned[key] = val
 
     def _try_restore_poly(self, f: BooleanNode) -> list[int] | None:
-        restorer = Restorer(self.conf, self.assigned)
-        evaluated = []
-        for i in range(len(f.children) + 1):
-            val = restorer._restore_threshold(f, at=i)
-            if val is None:
-                return None
-            evaluated.append(val)
-        return evaluated
+        return Restorer(self.conf, self.assigned)._restore_threshold_poly(f)
 
     def _try_restore(self, f: BooleanNode) -> list[int] | None:
         return Restorer(self.conf, self.assigned).restore(f)
@@ -169,28 +211,60 @@ class Splitter(MathBase):
         evaluated = self._try_restore_poly(f)
         if evaluated and evaluated[0] != secret:
             raise Exception("wrong polynom restored")
-        if not evaluated:
+        if evaluated:
+            self.polys[f] = interpolate(list(range(k)), evaluated[:k], self.mod)
+        else:
             # Generate new poly then
             poly = [secret] + self.rand(k - 1)
             is_random = True
+            self.polys[f] = poly
 
-            def evaluate(x):
-                res = 0
-                xpow = 1
-                for i in poly:
-                    res += i * xpow
-                    res %= self.mod
-                    xpow *= x
-                    xpow %= self.mod
-                return res
-
-            evaluated = [evaluate(i) for i in range(len(f.children) + 1)]
+            if k >= _poly.FAST_SPLIT_THRESHOLD:
+                evaluated = range_tree(len(f.children), self.mod).evaluate(poly)
+            else:
+                reduce = self.field.reduce
+                evaluated = []
+                for x in range(len(f.children) + 1):
+                    res = 0
+                    for c in reversed(poly):
+                        res = reduce(res * x + c)
+                    evaluated.append(res)
 
         assert evaluated[0] == secret
         for n, child in enumerate(f.children, 1):
             subsecret = evaluated[n]
             self.split(subsecret, child, is_random=is_random)
 
+    def _split_threshold_packed(self, secrets: list[int], f: BooleanNode):
+        k, n = f.threshold, len(f.children)
+        # At least one random value is left, so every node hides the secrets from some shares
+        if not 0 < len(secrets) < k:
+            raise ValueError(f"can pack 1 to {k - 1} secrets into a threshold of {k}, got {len(secrets)}")
+        if n + k >= self.mod:
+            raise ValueError("modulo is too small for packed sharing")
+        # Secrets sit at x = 0, -1, ..., -(L-1), random values at the rest of 0..-(k-1)
+        xs = [-j % self.mod for j in range(k)]
+        poly = interpolate(xs, secrets + self.rand(k - len(secrets)), self.mod)
+        evaluated = range_tree(n, self.mod).evaluate(poly)
+        for x, child in enumerate(f.children, 1):
+            self.split(evaluated[x], child, is_random=True)
+
+    def split_packed(self, secrets: list[int], f: BooleanNode):
+        if f.kind == NodeKind.VAR:
+            raise ValueError(f"packed sharing needs a threshold node above {f.name[0]!r}")
+        if f.kind == NodeKind.THRESHOLD:
+            self._split_threshold_packed(secrets, f)
+        if f.kind == NodeKind.OR:
+            for child in f.children:
+                self.split_packed(secrets, child)
+        if f.kind == NodeKind.AND:
+            summ = [0] * len(secrets)
+            for child in f.children[:-1]:
+                subsecrets = self.rand(len(secrets))
+                summ = [(a + b) % self.mod for a, b in zip(summ, subsecrets)]
+                self.split_packed(subsecrets, child)
+            self.split_packed([(a - b) % self.mod for a, b in zip(secrets, summ)], f.children[-1])
+
     def _split_and(self, secret: int, f: BooleanNode, is_random: bool):
         free = []
         summ = 0
@@ -239,13 +313,31 @@ class Splitter(MathBase):
 
 
 class Restorer(MathBase):
-    def __init__(self, conf: Configuration, given: dict[Any, int]):
+    def __init__(self, conf: Configuration, given: dict[Any, int], verify: bool = False):
         super().__init__(conf)
         self.given = given
+        self.verify = verify
+        self.inconsistent: set[str] = set()
 
-    def _restore_threshold(self, f: BooleanNode, at=0) -> int | None:
-        if f.kind != NodeKind.THRESHOLD:
-            return self.restore(f)
+    def _given_names(self, f: BooleanNode) -> set[str]:
+        if f.kind == NodeKind.VAR:
+            return {f.name[0]} if self.given.get(f.name) is not None else set()
+        return set().union(*(self._given_names(child) for child in f.children))
+
+    def _correct(self, f: BooleanNode, xs: list[int], ys: list[int]) -> tuple[list[int], list[int]] | None:
+        poly = rs_decode(xs, ys, f.threshold, self.mod)
+        if poly is None:
+            return None
+        good_xs, good_ys = [], []
+        for x, y in zip(xs, ys):
+            if poly_eval(poly, x, self.mod) == y:
+                good_xs.append(x)
+                good_ys.append(y)
+            else:
+                self.inconsistent |= self._given_names(f.children[x - 1])
+        return good_xs, good_ys
+
+    def _threshold_shares(self, f: BooleanNode) -> tuple[list[int], list[int]] | None:
         xs = []
         ys = []
         for n, child in enumerate(f.children, 1):
@@ -256,20 +348,72 @@ class Restorer(MathBase):
 
         if len(xs) < f.threshold:
             return None
-
-        secret = 0
-        x0 = at
-        for j in range(f.threshold):
-            product = 1
-            for i in range(f.threshold):
+        if self.verify and len(xs) > f.threshold:
+            corrected = self._correct(f, xs, ys)
+            if corrected is None:
+                return None
+            xs, ys = corrected
+        return xs[: f.threshold], ys[: f.threshold]
+
+    def _lagrange(self, xs: list[int], ys: list[int], at: int) -> int:
+        reduce = self.field.reduce
+        numerators = []
+        denominators = []
+        for j in range(len(xs)):
+            num = den = 1
+            for i in range(len(xs)):
                 if i != j:
-                    a = x0 - xs[i]
-                    b = xs[j] - xs[i]
-                    product *= a * self.inv(b)
-                    product %= self.mod
-            secret += ys[j] * product
-            secret %= self.mod
-        return secret
+                    num = reduce(num * (at - xs[i]))
+                    den = reduce(den * (xs[j] - xs[i]))
+            numerators.append(num)
+            denominators.append(den)
+        weights = batch_inverse(denominators, self.mod)
+        return reduce(sum(y * num * w for y, num, w in zip(ys, numerators, weights)))
+
+    def _restore_threshold(self, f: BooleanNode, at=0) -> int | None:
+        if f.kind != NodeKind.THRESHOLD:
+            return self.restore(f)
+        shares = self._threshold_shares(f)
+        if shares is None:
+            return None
+        if f.threshold >= _poly.FAST_RESTORE_THRESHOLD:
+            return poly_eval(interpolate(*shares, self.mod), at, self.mod)
+        return self._lagrange(*shares, at)
+
+    def _restore_threshold_poly(self, f: BooleanNode) -> list[int] | None:
+        """Values of the threshold polynomial at `0..len(f.children)`."""
+        shares = self._threshold_shares(f)
+        if shares is None:
+            return None
+        if f.threshold >= _poly.FAST_RESTORE_THRESHOLD:
+            return range_tree(len(f.children), self.mod).evaluate(interpolate(*shares, self.mod))
+        return [self._lagrange(*shares, at) for at in range(len(f.children) + 1)]
+
+    def restore_packed(self, f: BooleanNode, count: int) -> list[int] | None:
+        if f.kind == NodeKind.VAR:
+            raise ValueError(f"packed sharing needs a threshold node above {f.name[0]!r}")
+        if f.kind == NodeKind.THRESHOLD:
+            # More values would include the random padding
+            if not 0 < count < f.threshold:
+                raise ValueError(f"at most {f.threshold - 1} secrets are packed into a threshold of {f.threshold}")
+            shares = self._threshold_shares(f)
+            if shares is None:
+                return None
+            poly = interpolate(*shares, self.mod)
+            return multipoint_eval(poly, [-j % self.mod for j in range(count)], self.mod)
+        if f.kind == NodeKind.OR:
+            for child in f.children:
+                if (restored := self.restore_packed(child, count)) is not None:
+                    return restored
+            return None
+        if f.kind == NodeKind.AND:
+            result = [0] * count
+            for child in f.children:
+                restored = self.restore_packed(child, count)
+                if restored is None:
+                    return None
+                result = [(a + b) % self.mod for a, b in zip(result, restored)]
+            return result
 
     def restore(self, f: BooleanNode) -> int | None:
         if f.kind == NodeKind.VAR:
@@ -292,3 +436,11 @@ class Restorer(MathBase):
                 result += restored
                 result %= self.mod
             return result
+
+
+from .batch import PartBatch, SecretView
+from .plan import SplitPlan
+from .vss import Commitments, Group
+from .cache import CompiledCache, default_cache
+from .engine import Engine
+from .delta import ShareDelta
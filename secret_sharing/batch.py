@@ -0,0 +1,298 @@
+from array import array
+from typing import Any, Iterable, Iterator
+import struct
+import sys
+
+from . import Part
+
+__all__ = ("PartBatch", "SecretView")
+
+_MAGIC = b"SSPB"
+_FORMAT_VERSION = 2
+_HEADER = struct.Struct("<4sBHQI")  # magic, version, limbs, secrets, participants
+_PARTICIPANT = struct.Struct("<HIB")  # name length, number of indices, has presence mask
+_PARTICIPANT_V1 = struct.Struct("<HI")
+_MASK = (1 << 64) - 1
+
+
+def _limbs(modulo: int) -> int:
+    return max(1, ((modulo - 1).bit_length() + 63) // 64)
+
+
+class PartBatch:
+    """Shares of many secrets split with one configuration, stored by column.
+
+    Every participant owns one contiguous `array("Q")` laid out as
+    `[secret][index][limb]`, where values wider than 64 bits take several
+    little-endian limbs. Single secrets are accessed through `SecretView`s.
+
+    Shares may be missing (`None`), as `modify` leaves them for removed slots.
+    Participants with missing shares get a presence mask of one byte per
+    `[secret][index]`, where missing values are stored as zeros.
+    """
+
+    __slots__ = ("size", "limbs", "indices", "_columns", "_present")
+
+    def __init__(
+        self,
+        indices: dict[str, int],
+        size: int,
+        limbs: int,
+        columns: dict[str, array] = None,
+        present: dict[str, bytearray] = None,
+    ) -> None:
+        self.size = size
+        self.limbs = limbs
+        self.indices = dict(indices)
+        if columns is None:
+            columns = {name: array("Q", bytes(8 * size * n * limbs)) for name, n in self.indices.items()}
+        present = {name: mask for name, mask in (present or {}).items() if name in self.indices}
+        for name, n in self.indices.items():
+            if len(columns[name]) != size * n * limbs:
+                raise ValueError(f"column of {name!r} has wrong length")
+            if name in present and len(present[name]) != size * n:
+                raise ValueError(f"presence mask of {name!r} has wrong length")
+        self._columns = columns
+        self._present = present
+
+    @classmethod
+    def empty(cls, indices: dict[str, int], size: int, modulo: int) -> "PartBatch":
+        return cls(indices, size, _limbs(modulo))
+
+    @classmethod
+    def from_parts(cls, batch: list[list[Part]], modulo: int) -> "PartBatch":
+        """Batch of `list[Part]` splits with the same participants holding the same indices."""
+        if not batch:
+            return cls({}, 0, _limbs(modulo))
+        indices = {part.name: len(part.values) for part in batch[0]}
+        result = cls.empty(indices, len(batch), modulo)
+        for secret, parts in enumerate(batch):
+            if {part.name: len(part.values) for part in parts} != indices:
+                raise ValueError("all splits in a batch must have the same participants")
+            for part in parts:
+                for idx, val in enumerate(part.values, 1):
+                    result.set(part.name, secret, idx, val)
+        return result
+
+    @property
+    def names(self) -> list[str]:
+        return list(self.indices)
+
+    def __len__(self) -> int:
+        return self.size
+
+    def __getitem__(self, secret: int) -> "SecretView":
+        if not -self.size <= secret < self.size:
+            raise IndexError("secret index out of range")
+        return SecretView(self, secret % self.size)
+
+    def __iter__(self) -> Iterator["SecretView"]:
+        return (SecretView(self, i) for i in range(self.size))
+
+    def __eq__(self, other: object) -> bool:
+        if not isinstance(other, PartBatch):
+            return NotImplemented
+        return (self.size, self.limbs, self.indices, self._selected(), self._masks()) == (
+            other.size,
+            other.limbs,
+            other.indices,
+            other._selected(),
+            other._masks(),
+        )
+
+    def _selected(self) -> dict[str, array]:
+        # `select` shares the columns of all participants
+        return {name: self._columns[name] for name in self.indices}
+
+    def _masks(self) -> dict[str, bytearray]:
+        return {name: mask for name, mask in self._present.items() if 0 in mask}
+
+    @property
+    def has_missing(self) -> bool:
+        return any(0 in mask for mask in self._present.values())
+
+    def missing(self, secret: int) -> frozenset[tuple[str, int]]:
+        """`(name, idx)` of the missing shares of a secret."""
+        result = []
+        for name, mask in self._present.items():
+            n = self.indices[name]
+            result += [(name, idx) for idx in range(1, n + 1) if not mask[secret * n + idx - 1]]
+        return frozenset(result)
+
+    def __repr__(self) -> str:
+        return f"PartBatch(secrets={self.size}, participants={self.names})"
+
+    def _offset(self, name: str, secret: int, idx: int) -> int:
+        return (secret * self.indices[name] + idx - 1) * self.limbs
+
+    def get(self, name: str, secret: int, idx: int) -> int | None:
+        if name in self._present and not self._present[name][secret * self.indices[name] + idx - 1]:
+            return None
+        col, pos = self._columns[name], self._offset(name, secret, idx)
+        if self.limbs == 1:
+            return col[pos]
+        return sum(col[pos + i] << (64 * i) for i in range(self.limbs))
+
+    def set(self, name: str, secret: int, idx: int, val: int | None) -> None:
+        if val is not None and not isinstance(val, int):
+            raise ValueError(f"share values must be integers or None, got {type(val).__name__}")
+        col, pos = self._columns[name], self._offset(name, secret, idx)
+        if val is None or name in self._present:
+            n = self.indices[name]
+            if name not in self._present:
+                self._present[name] = bytearray(b"\x01" * (self.size * n))
+            self._present[name][secret * n + idx - 1] = val is not None
+            val = val or 0
+        for i in range(self.limbs):
+            col[pos + i] = (val >> (64 * i)) & _MASK
+
+    def column(self, name: str, idx: int) -> list[int]:
+        """Values of share `idx` of `name` for every secret, with zeros for missing ones."""
+        col, n, limbs = self._columns[name], self.indices[name], self.limbs
+        step = n * limbs
+        start = (idx - 1) * limbs
+        res = col[start::step].tolist()
+        for i in range(1, limbs):
+            shift = 64 * i
+            res = [v | (limb << shift) for v, limb in zip(res, col[start + i :: step])]
+        return res
+
+    def set_column(self, name: str, idx: int, values: list[int]) -> None:
+        col, n, limbs = self._columns[name], self.indices[name], self.limbs
+        step = n * limbs
+        start = (idx - 1) * limbs
+        for i in range(limbs):
+            shift = 64 * i
+            col[start + i :: step] = array("Q", [(v >> shift) & _MASK for v in values])
+
+    def select(self, names: Iterable[str]) -> "PartBatch":
+        """Batch with the shares of `names` only, sharing the underlying buffers."""
+        names = [name for name in names if name in self.indices]
+        indices = {name: self.indices[name] for name in names}
+        return PartBatch(indices, self.size, self.limbs, self._columns, self._present)
+
+    def slice(self, start: int, stop: int) -> "PartBatch":
+        """Batch with the shares of secrets `start..stop - 1`."""
+        secrets = range(self.size)[start:stop]
+        start, stop = secrets.start, secrets.start + len(secrets)
+        columns = {}
+        for name, n in self.indices.items():
+            step = n * self.limbs
+            columns[name] = self._columns[name][start * step : stop * step]
+        present = {}
+        for name, mask in self._present.items():
+            n = self.indices[name]
+            present[name] = mask[start * n : stop * n]
+        return PartBatch(self.indices, stop - start, self.limbs, columns, present)
+
+    @classmethod
+    def concat(cls, batches: list["PartBatch"]) -> "PartBatch":
+        """Batch with the secrets of all `batches`, which must have the same participants."""
+        if not batches:
+            raise ValueError("nothing to concatenate")
+        first = batches[0]
+        for batch in batches:
+            if batch.indices != first.indices or batch.limbs != first.limbs:
+                raise ValueError("all batches must have the same participants and limbs")
+        columns = {name: array("Q") for name in first.indices}
+        masked = {name for batch in batches for name in batch._present}
+        present = {name: bytearray() for name in masked}
+        for batch in batches:
+            for name, col in columns.items():
+                col += batch._columns[name]
+            for name, mask in present.items():
+                mask += batch._present.get(name, b"\x01" * (batch.size * batch.indices[name]))
+        return cls(first.indices, sum(batch.size for batch in batches), first.limbs, columns, present)
+
+    def numpy(self, name: str) -> Any:
+        """Zero-copy `(secrets, indices, limbs)` NumPy view of the column of `name`, zeros where missing."""
+        import numpy
+
+        return numpy.frombuffer(self._columns[name], dtype=numpy.uint64).reshape(
+            self.size, self.indices[name], self.limbs
+        )
+
+    def to_parts(self) -> list[list[Part]]:
+        return [view.parts() for view in self]
+
+    def to_bytes(self) -> bytes:
+        chunks = [_HEADER.pack(_MAGIC, _FORMAT_VERSION, self.limbs, self.size, len(self.indices))]
+        masks = self._masks()
+        for name, n in self.indices.items():
+            encoded = name.encode("utf-8")
+            col = self._columns[name]
+            if sys.byteorder != "little":
+                col = array("Q", col)
+                col.byteswap()
+            chunks += [_PARTICIPANT.pack(len(encoded), n, name in masks), encoded]
+            if name in masks:
+                chunks.append(bytes(masks[name]))
+            chunks.append(col.tobytes())
+        return b"".join(chunks)
+
+    @classmethod
+    def from_bytes(cls, data: bytes) -> "PartBatch":
+        view = memoryview(data)
+        try:
+            magic, version, limbs, size, count = _HEADER.unpack_from(view)
+        except struct.error:
+            raise ValueError("truncated share batch") from None
+        if magic != _MAGIC or version not in (1, _FORMAT_VERSION):
+            raise ValueError("not a share batch or unsupported version")
+        pos = _HEADER.size
+        indices, columns, present = {}, {}, {}
+        try:
+            for _ in range(count):
+                if version == 1:
+                    (length, n), masked = _PARTICIPANT_V1.unpack_from(view, pos), False
+                    pos += _PARTICIPANT_V1.size
+                else:
+                    length, n, masked = _PARTICIPANT.unpack_from(view, pos)
+                    pos += _PARTICIPANT.size
+                name = bytes(view[pos : pos + length]).decode("utf-8")
+                pos += length
+                if masked:
+                    if pos + size * n > len(view):
+                        raise ValueError("truncated share batch")
+                    present[name] = bytearray(view[pos : pos + size * n])
+                    pos += size * n
+                end = pos + 8 * size * n * limbs
+                if end > len(view):
+                    raise ValueError("truncated share batch")
+                col = array("Q")
+                col.frombytes(view[pos:end])
+                if sys.byteorder != "little":
+                    col.byteswap()
+                indices[name], columns[name] = n, col
+                pos = end
+        except struct.error:
+            raise ValueError("truncated share batch") from None
+        if pos != len(view):
+            raise ValueError("trailing data after share batch")
+        return cls(indices, size, limbs, columns, present)
+
+
+class SecretView:
+    """Shares of a single secret of a `PartBatch`, without copying them out."""
+
+    __slots__ = ("batch", "secret")
+
+    def __init__(self, batch: PartBatch, secret: int) -> None:
+        self.batch = batch
+        self.secret = secret
+
+    def values(self, name: str) -> list[int]:
+        return [self.batch.get(name, self.secret, idx) for idx in range(1, self.batch.indices[name] + 1)]
+
+    def items(self) -> Iterator[tuple[tuple[str, int], int]]:
+        """`((name, idx), value)` of every present share, as `Restorer` takes them."""
+        for name, n in self.batch.indices.items():
+            for idx in range(1, n + 1):
+                if (val := self.batch.get(name, self.secret, idx)) is not None:
+                    yield (name, idx), val
+
+    def parts(self) -> list[Part]:
+        return [Part(name, self.values(name)) for name in self.batch.indices]
+
+    def __repr__(self) -> str:
+        return f"SecretView({self.parts()})"
@@ -1,6 +1,7 @@
-from copy import copy
 from enum import Enum
-from typing import Any
+from threading import Lock
+from typing import Any, Iterable
+from weakref import WeakValueDictionary
 
 
 __all__ = ("NodeKind", "BooleanNode")
@@ -14,10 +15,22 @@ class NodeKind(Enum):
 
 
 class BooleanNode:
-    def __init__(
-        self,
+    """Immutable node of a boolean formula.
+
+    Nodes are hash-consed: constructing a node equal to a live one returns that
+    instance, so identical subtrees are shared, equality is identity and the
+    structural hash is computed once. Nodes can key memo tables of subtree results.
+    """
+
+    __slots__ = ("_kind", "_children", "_name", "_threshold", "_hash", "__weakref__")
+
+    _interned: "WeakValueDictionary[tuple, BooleanNode]" = WeakValueDictionary()
+    _lock = Lock()
+
+    def __new__(
+        cls,
         kind: NodeKind,
-        children: list["BooleanNode"] = None,
+        children: Iterable["BooleanNode"] = None,
         name: Any = None,
         threshold: int = None,
     ):
@@ -33,11 +46,37 @@ class BooleanNode:
         if kind == NodeKind.THRESHOLD and threshold is None:
             raise ValueError("`threshold` is required for `NodeKind.THRESHOLD`")
 
-        self._kind = kind
-        self._children = children or []
-        self._name = name
-        self._threshold = threshold
-        self._variables = None  # cached
+        children = tuple(children or ())
+        # Children are interned already, so comparing the key tuples is shallow
+        key = (kind, name, threshold, children)
+        with cls._lock:
+            node = cls._interned.get(key)
+            if node is None:
+                node = object.__new__(cls)
+                setattr_ = object.__setattr__
+                setattr_(node, "_kind", kind)
+                setattr_(node, "_children", children)
+                setattr_(node, "_name", name)
+                setattr_(node, "_threshold", threshold)
+                setattr_(node, "_hash", hash(key))
+                cls._interned[key] = node
+        return node
+
+    def __setattr__(self, name: str, value: Any) -> None:
+        raise AttributeError("BooleanNode is immutable")
+
+    def __delattr__(self, name: str) -> None:
+        raise AttributeError("BooleanNode is immutable")
+
+    def __reduce__(self) -> tuple:
+        children = None if self._kind == NodeKind.VAR else self._children
+        return BooleanNode, (self._kind, children, self._name, self._threshold)
+
+    def __copy__(self) -> "BooleanNode":
+        return self
+
+    def __deepcopy__(self, memo: dict) -> "BooleanNode":
+        return self
 
     @classmethod
     def or_(cls, *children: list["BooleanNode"]) -> "BooleanNode":
@@ -76,7 +115,7 @@ class BooleanNode:
         return self._kind
 
     @property
-    def children(self) -> list["BooleanNode"]:
+    def children(self) -> tuple["BooleanNode", ...]:
         if self._kind == NodeKind.VAR:
             raise ValueError("variables have no children")
         return self._children
@@ -107,18 +146,10 @@ class BooleanNode:
         return f"BooleanNode({self})"
 
     def __eq__(self, other: object) -> bool:
-        if self is other:
-            return True
-        if not isinstance(other, BooleanNode):
-            return False
-        if self.kind != other.kind:
-            return False
-        if self.kind == NodeKind.VAR:
-            return self.name == other.name
-        if self.kind == NodeKind.THRESHOLD:
-            return self.threshold == other.threshold and self.children == other.children
-        if self.kind in (NodeKind.AND, NodeKind.OR):
-            return self.children == other.children
+        return self is other
+
+    def __hash__(self) -> int:
+        return self._hash
 
     def __or__(self, other: Any):
         if not isinstance(other, BooleanNode):
@@ -131,10 +162,17 @@ class BooleanNode:
         return self.and_(self, other)
 
     def walk(self, f) -> "BooleanNode":
-        copied = copy(self)
-        res = f(copied)
+        """Rebuild the tree top-down with `f` applied to every node, sharing unchanged subtrees.
+
+        `f` returns a replacement node or `None` to keep the node. Shared subtrees
+        are visited once per occurrence.
+        """
+        res = f(self)
         if res is None:
-            res = copied
-        if res._children:
-            res._children = [child.walk(f) for child in res.children]
-        return res
+            res = self
+        if res._kind == NodeKind.VAR or not res._children:
+            return res
+        children = tuple(child.walk(f) for child in res._children)
+        if all(new is old for new, old in zip(children, res._children)):
+            return res
+        return BooleanNode(res._kind, children=children, threshold=res._threshold)
@@ -0,0 +1,151 @@
+from contextlib import suppress
+from hashlib import sha256
+from pathlib import Path
+from typing import Any
+import json
+import marshal
+import os
+import sys
+import tempfile
+import threading
+
+from . import Configuration, __version__
+from .boolean import BooleanNode, NodeKind
+from .plan import SplitPlan
+
+__all__ = ("CompiledCache", "default_cache", "set_default_cache")
+
+# Bump whenever the layout of cached entries changes.
+FORMAT_VERSION = 2
+
+_default: "CompiledCache | None" = None
+_default_lock = threading.Lock()
+
+
+def _dump_node(f: BooleanNode) -> tuple:
+    if f.kind == NodeKind.VAR:
+        return (f.kind.value, f.name)
+    threshold = f.threshold if f.kind == NodeKind.THRESHOLD else None
+    return (f.kind.value, threshold, tuple(_dump_node(child) for child in f.children))
+
+
+def _load_node(data: tuple) -> BooleanNode:
+    kind = NodeKind(data[0])
+    if kind == NodeKind.VAR:
+        return BooleanNode.var(data[1])
+    return BooleanNode(kind, threshold=data[1], children=[_load_node(child) for child in data[2]])
+
+
+class CompiledCache:
+    """On-disk cache of compiled configurations: the formula and its `SplitPlan`.
+
+    Entries are keyed by a hash of `formula`, `modulo`, `version`, the library
+    version and the interpreter and `marshal` versions, stored with `marshal` after
+    a sha256 of the payload and replaced atomically. Corrupted, unreadable or stale
+    entries, and plans not matching their formula, are recompiled and overwritten.
+    If entries can't be written, the cache only keeps them in memory.
+
+    The cache may be shared between threads and processes: concurrent misses
+    may compile the same entry twice, but readers never see a partial file.
+    """
+
+    def __init__(self, path: str | os.PathLike = None) -> None:
+        if path is None:
+            path = Path(os.environ.get("XDG_CACHE_HOME", Path.home() / ".cache")) / "secret_sharing"
+        self.path = Path(path)
+        self._formulas: dict[str, BooleanNode] = {}
+        self._plans: dict[str, SplitPlan] = {}
+
+    def key(self, conf: Configuration) -> str:
+        data = [conf.formula, conf.modulo, conf.version, __version__, FORMAT_VERSION]
+        data += [list(sys.version_info[:2]), marshal.version]
+        return sha256(json.dumps(data, ensure_ascii=False).encode("utf-8")).hexdigest()
+
+    def _file(self, key: str, kind: str) -> Path:
+        return self.path / f"{key}.{kind}.bin"
+
+    def _read(self, key: str, kind: str) -> Any:
+        # The formula and the much larger plan live in separate files, so that
+        # loading a formula doesn't pay for the plan.
+        try:
+            raw = self._file(key, kind).read_bytes()
+            digest, payload = raw[:32], raw[32:]
+            if sha256(payload).digest() != digest:
+                return None
+            data = marshal.loads(payload)
+        except (OSError, EOFError, ValueError, TypeError):
+            return None
+        if not isinstance(data, tuple) or len(data) != 2 or data[0] != key:
+            return None
+        return data[1]
+
+    def _write(self, key: str, kind: str, data: Any) -> None:
+        self.path.mkdir(parents=True, exist_ok=True)
+        fd, tmp = tempfile.mkstemp(dir=self.path, prefix=f".{key}.")
+        try:
+            payload = marshal.dumps((key, data))
+            with os.fdopen(fd, "wb") as f:
+                f.write(sha256(payload).digest() + payload)
+            os.replace(tmp, self._file(key, kind))
+        except BaseException:
+            with suppress(OSError):
+                os.unlink(tmp)
+            raise
+
+    def _store(self, key: str, kind: str, data: Any) -> None:
+        # A cache that can't be written degrades to compiling without storing
+        with suppress(OSError):
+            self._write(key, kind, data)
+
+    def formula(self, conf: Configuration) -> BooleanNode:
+        key = self.key(conf)
+        if key not in self._formulas:
+            formula = None
+            if (data := self._read(key, "formula")) is not None:
+                try:
+                    formula = _load_node(data)
+                except (ValueError, TypeError, IndexError):
+                    pass
+            if formula is None:
+                formula = conf._make_formula()
+                self._store(key, "formula", _dump_node(formula))
+            self._formulas[key] = formula
+        return self._formulas[key]
+
+    def plan(self, conf: Configuration) -> SplitPlan:
+        key = self.key(conf)
+        if key not in self._plans:
+            formula = self.formula(conf)
+            plan = None
+            if (data := self._read(key, "plan")) is not None:
+                try:
+                    plan = SplitPlan(conf, formula=formula, state=data)
+                except (ValueError, TypeError, IndexError):
+                    pass
+            if plan is None:
+                plan = SplitPlan(conf, formula=formula)
+                self._store(key, "plan", plan.state())
+            self._plans[key] = plan
+        return self._plans[key]
+
+    def clear(self) -> None:
+        self._formulas.clear()
+        self._plans.clear()
+        for file in self.path.glob("*.bin"):
+            file.unlink(missing_ok=True)
+
+
+def default_cache() -> CompiledCache | None:
+    """Cache used by `Configuration`: set explicitly or by `SECRET_SHARING_CACHE` directory."""
+    global _default
+    if _default is None and os.environ.get("SECRET_SHARING_CACHE"):
+        with _default_lock:
+            if _default is None:
+                _default = CompiledCache(os.environ["SECRET_SHARING_CACHE"])
+    return _default
+
+
+def set_default_cache(cache: CompiledCache | None) -> None:
+    global _default
+    with _default_lock:
+        _default = cache
@@ -0,0 +1,103 @@
+from base64 import urlsafe_b64decode, urlsafe_b64encode
+from dataclasses import dataclass, field
+from enum import Enum
+from typing import Any
+import json
+
+from . import Configuration, Part
+from .boolean import BooleanNode, NodeKind
+
+__all__ = ("ChangeKind", "ShareDelta", "SlotChange")
+
+
+class ChangeKind(Enum):
+    NEW = "new"
+    CHANGED = "changed"
+    REVOKED = "revoked"
+
+
+@dataclass(frozen=True)
+class SlotChange:
+    name: str
+    idx: int
+    kind: ChangeKind
+    value: int | None = None
+
+
+@dataclass
+class ShareDelta:
+    """Shares that differ between two configurations of one secret.
+
+    Slots whose value stays the same are only counted in `unchanged`. A slot
+    which existed before but whose value wasn't supplied to `modify` is
+    reported as `CHANGED`, since its holder may still have an old value.
+    """
+
+    version: int
+    changes: list[SlotChange] = field(default_factory=list)
+    unchanged: int = 0
+
+    @staticmethod
+    def _slots(formula: BooleanNode) -> set[Any]:
+        result = set()
+
+        def walker(node: BooleanNode):
+            if node.kind == NodeKind.VAR:
+                result.add(node.name)
+
+        formula.walk(walker)
+        return result
+
+    @classmethod
+    def compute(cls, old: Configuration, new: Configuration, given: list[Part], after: list[Part]) -> "ShareDelta":
+        before = {}
+        for part in given:
+            for idx, val in enumerate(part.values, 1):
+                if val is not None:
+                    before[(part.name, idx)] = val
+        old_slots = cls._slots(old.make_formula())
+        new_slots = cls._slots(new.make_formula())
+
+        delta = cls(version=new.version)
+        for part in after:
+            for idx, val in enumerate(part.values, 1):
+                slot = (part.name, idx)
+                if slot not in new_slots:
+                    if slot in old_slots:
+                        delta.changes.append(SlotChange(part.name, idx, ChangeKind.REVOKED))
+                elif slot not in old_slots:
+                    delta.changes.append(SlotChange(part.name, idx, ChangeKind.NEW, val))
+                elif before.get(slot) == val:
+                    delta.unchanged += 1
+                else:
+                    delta.changes.append(SlotChange(part.name, idx, ChangeKind.CHANGED, val))
+        return delta
+
+    def by_participant(self) -> dict[str, list[SlotChange]]:
+        result = {}
+        for change in self.changes:
+            result.setdefault(change.name, []).append(change)
+        return result
+
+    def apply(self, parts: list[Part]) -> list[Part]:
+        """Parts of participants updated to the new configuration; revoked shares become `None`."""
+        result = {part.name: Part(part.name, list(part.values)) for part in parts}
+        for change in self.changes:
+            part = result.setdefault(change.name, Part(change.name, []))
+            part.values.extend([None] * (change.idx - len(part.values)))
+            part.values[change.idx - 1] = change.value
+        return list(result.values())
+
+    def serialize(self) -> str:
+        data = {
+            "version": self.version,
+            "unchanged": self.unchanged,
+            "changes": [[c.name, c.idx, c.kind.value, c.value] for c in self.changes],
+        }
+        return urlsafe_b64encode(json.dumps(data, ensure_ascii=False).encode("utf-8"))
+
+    @classmethod
+    def deserialize(cls, s: str) -> "ShareDelta":
+        data = json.loads(urlsafe_b64decode(s).decode("utf-8"))
+        changes = [SlotChange(name, idx, ChangeKind(kind), value) for name, idx, kind, value in data["changes"]]
+        return cls(version=data["version"], changes=changes, unchanged=data["unchanged"])
@@ -0,0 +1,117 @@
+from functools import lru_cache
+from threading import Lock
+from typing import Any
+
+from . import Configuration, Part, Restorer, Splitter
+from .batch import PartBatch, SecretView
+from .cache import default_cache
+from .plan import SplitPlan
+from .vss import Commitments, Group
+
+__all__ = ("Engine",)
+
+
+class Engine:
+    """Compiled `Configuration` which can be shared between threads.
+
+    The engine keeps a private copy of the configuration and its formula, and
+    never changes them after construction. Every call creates its own `Splitter`
+    or `Restorer`, random generator and working dictionaries, and doesn't modify
+    its arguments, so any number of threads may split and restore concurrently
+    on one engine, with or without the GIL. The only lazily built state, the
+    `SplitPlan` and its recombination vectors, is created under a lock or is
+    idempotent to fill.
+    """
+
+    def __init__(self, conf: Configuration) -> None:
+        self._conf = Configuration(modulo=conf.modulo, formula=conf.formula, version=conf.version)
+        self._formula = self._conf.make_formula()
+        self._plan = None
+        self._lock = Lock()
+
+    @classmethod
+    def shared(cls, conf: Configuration) -> "Engine":
+        """Engine of `conf` memoized per configuration, keeping its plan between calls."""
+        return _shared(conf.modulo, conf.formula, conf.version)
+
+    @property
+    def conf(self) -> Configuration:
+        return self._conf
+
+    @property
+    def modulo(self) -> int:
+        return self._conf.modulo
+
+    @property
+    def plan(self) -> SplitPlan:
+        if self._plan is None:
+            with self._lock:
+                if self._plan is None:
+                    if (cache := default_cache()) is not None:
+                        self._plan = cache.plan(self._conf)
+                    else:
+                        self._plan = SplitPlan(self._conf, formula=self._formula)
+        return self._plan
+
+    @staticmethod
+    def _given(parts: list[Part] | SecretView) -> dict[Any, int]:
+        if isinstance(parts, SecretView):
+            return dict(parts.items())
+        given = {}
+        for part in parts:
+            for idx, val in enumerate(part.values, 1):
+                given[(part.name, idx)] = val
+        return given
+
+    @staticmethod
+    def _collect(assigned: dict[Any, int]) -> list[Part]:
+        split = list(assigned.items())
+        split.sort(key=lambda x: x[0][1])
+        result = {}
+        for key, val in split:
+            name, idx = key
+            if name not in result:
+                result[name] = Part(name, [])
+            assert idx - 1 == len(result[name].values)
+            result[name].values.append(val)
+        return list(result.values())
+
+    def _split(self, secret: int, seed=None, assigned: dict[Any, int] = None) -> Splitter:
+        splitter = Splitter(self._conf, seed=seed, assigned=assigned)
+        splitter.split(secret % self.modulo, self._formula)
+        return splitter
+
+    def split(self, secret: int, seed=None, assigned: dict[Any, int] = None) -> list[Part]:
+        return self._collect(self._split(secret, seed=seed, assigned=assigned).assigned)
+
+    def split_committed(self, secret: int, seed=None, bits: int = 2048) -> tuple[list[Part], Commitments]:
+        group = Group.for_order(self.modulo, bits)
+        splitter = self._split(secret, seed=seed)
+        commitments = Commitments.commit(group, self._formula, splitter.polys)
+        return self._collect(splitter.assigned), commitments
+
+    def restore(self, parts: list[Part] | SecretView) -> int | None:
+        return Restorer(self._conf, self._given(parts)).restore(self._formula)
+
+    def split_packed(self, secrets: list[int], seed=None) -> list[Part]:
+        splitter = Splitter(self._conf, seed=seed)
+        splitter.split_packed([s % self.modulo for s in secrets], self._formula)
+        return self._collect(splitter.assigned)
+
+    def restore_packed(self, parts: list[Part] | SecretView, count: int) -> list[int] | None:
+        return Restorer(self._conf, self._given(parts)).restore_packed(self._formula, count)
+
+    def restore_verified(self, parts: list[Part] | SecretView) -> tuple[int | None, set[str]]:
+        restorer = Restorer(self._conf, self._given(parts), verify=True)
+        return restorer.restore(self._formula), restorer.inconsistent
+
+    def split_batch(self, secrets: list[int], seed=None) -> PartBatch:
+        return self.plan.split_batch(secrets, seed=seed)
+
+    def restore_batch(self, batch: PartBatch | list[list[Part]]) -> list[int | None]:
+        return self.plan.restore_batch(batch)
+
+
+@lru_cache(maxsize=64)
+def _shared(modulo: int, formula: str, version: int) -> Engine:
+    return Engine(Configuration(modulo=modulo, formula=formula, version=version))
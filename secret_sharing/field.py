@@ -0,0 +1,137 @@
+from functools import lru_cache
+from math import gcd, prod
+import secrets
+
+__all__ = ("FIELDS", "Field", "MersenneField", "PseudoMersenneField", "field_for", "is_probable_prime")
+
+_SMALL_PRIMES = tuple(n for n in range(2, 2000) if all(n % d for d in range(2, int(n**0.5) + 1)))
+_PRIMORIAL = prod(_SMALL_PRIMES)
+
+
+def is_probable_prime(n: int, rounds: int = 24) -> bool:
+    """Miller-Rabin test, deterministic below 3.3 * 10^24."""
+    if n <= _SMALL_PRIMES[-1]:
+        return n in _SMALL_PRIMES
+    if gcd(n, _PRIMORIAL) != 1:
+        return False
+    d, s = n - 1, 0
+    while not d & 1:
+        d >>= 1
+        s += 1
+    bases = list(_SMALL_PRIMES[:13])
+    if n >= 3317044064679887385961981:
+        bases += [secrets.randbelow(n - 3) + 2 for _ in range(rounds)]
+    for a in bases:
+        x = pow(a, d, n)
+        if x in (1, n - 1):
+            continue
+        for _ in range(s - 1):
+            x = x * x % n
+            if x == n - 1:
+                break
+        else:
+            return False
+    return True
+
+
+class Field:
+    """Integers modulo a prime, reduced with the generic `%`.
+
+    `reduce` and `reduce_many` accept any integers, including unreduced sums
+    of products, so hot loops can accumulate and reduce once.
+    """
+
+    def __init__(self, modulus: int, name: str = None) -> None:
+        self.modulus = modulus
+        self.name = name
+
+    def __repr__(self) -> str:
+        return f"{type(self).__name__}({self.name or self.modulus})"
+
+    def reduce(self, x: int) -> int:
+        return x % self.modulus
+
+    def reduce_many(self, xs: list[int]) -> list[int]:
+        p = self.modulus
+        return [x % p for x in xs]
+
+    def inv(self, x: int) -> int:
+        return pow(x, -1, self.modulus)
+
+
+class PseudoMersenneField(Field):
+    """Prime `2^bits - c` for a small `c`: `2^bits` folds down to `c`, so reduction is shift-and-add."""
+
+    def __init__(self, bits: int, c: int, name: str = None) -> None:
+        super().__init__((1 << bits) - c, name)
+        self.bits = bits
+        self.c = c
+        self.mask = (1 << bits) - 1
+
+    def reduce(self, x: int) -> int:
+        if x < 0:
+            return x % self.modulus
+        bits, mask, c = self.bits, self.mask, self.c
+        while x >> bits:
+            x = (x & mask) + c * (x >> bits)
+        return x - self.modulus if x >= self.modulus else x
+
+    def reduce_many(self, xs: list[int]) -> list[int]:
+        bits, mask, c, p = self.bits, self.mask, self.c, self.modulus
+        res = []
+        for x in xs:
+            if x < 0:
+                x %= p
+            while x >> bits:
+                x = (x & mask) + c * (x >> bits)
+            res.append(x - p if x >= p else x)
+        return res
+
+
+class MersenneField(PseudoMersenneField):
+    """Mersenne prime `2^bits - 1`, where folding needs no multiplication."""
+
+    def __init__(self, bits: int, name: str = None) -> None:
+        super().__init__(bits, 1, name)
+
+    def reduce(self, x: int) -> int:
+        if x < 0:
+            return x % self.modulus
+        bits, p = self.bits, self.modulus
+        while x >> bits:
+            x = (x & p) + (x >> bits)
+        return 0 if x == p else x
+
+    def reduce_many(self, xs: list[int]) -> list[int]:
+        bits, p = self.bits, self.modulus
+        res = []
+        for x in xs:
+            if x < 0:
+                x %= p
+            while x >> bits:
+                x = (x & p) + (x >> bits)
+            res.append(0 if x == p else x)
+        return res
+
+
+# Below a few hundred bits the interpreter's `%` on a few-digit integer is faster
+# than an interpreted shift-and-add, so only 2^521 - 1 gets the specialised
+# reduction (see benchmarks/field.py, which times both).
+FIELDS: dict[str, Field] = {
+    "mersenne61": Field((1 << 61) - 1, "mersenne61"),
+    "mersenne127": Field((1 << 127) - 1, "mersenne127"),
+    "mersenne521": MersenneField(521, "mersenne521"),
+    "p25519": Field((1 << 255) - 19, "p25519"),
+}
+
+_BY_MODULUS = {field.modulus: field for field in FIELDS.values()}
+
+
+@lru_cache(maxsize=64)
+def field_for(modulus: int) -> Field:
+    """Field of a configuration modulo: a preset if it is one, else checked to be prime."""
+    if modulus in _BY_MODULUS:
+        return _BY_MODULUS[modulus]
+    if not is_probable_prime(modulus):
+        raise ValueError(f"modulo must be prime, got {modulus}")
+    return Field(modulus)
@@ -0,0 +1,237 @@
+from collections import OrderedDict
+from threading import Lock
+from typing import Any, Iterable
+
+from . import Configuration, MathBase, Part
+from .field import Field, field_for
+from .batch import PartBatch
+from .boolean import BooleanNode, NodeKind
+from .poly import lagrange_basis
+
+__all__ = ("SplitPlan",)
+
+# A linear form over the split inputs: column 0 is the secret, other columns
+# are the random values drawn during the split. Maps column to coefficient.
+Form = dict[int, int]
+
+# Recombination vectors kept per plan, one per distinct set of available shares.
+RECOMBINATION_CACHE_SIZE = 256
+
+
+class SplitPlan:
+    """Formula of a `Configuration` compiled into a share generation matrix.
+
+    Every share is a fixed linear combination of the secret and the random
+    values of the split, so splitting a batch is one matrix product over the
+    field and restoring from a participant set is one precomputed dot product.
+    """
+
+    def __init__(self, conf: Configuration, formula: BooleanNode = None, state: tuple = None) -> None:
+        self.conf = conf
+        self.mod = conf.modulo
+        self.formula = formula or conf.make_formula()
+        self._recombination: OrderedDict[frozenset[Any], dict[Any, int] | None] = OrderedDict()
+        self._recombination_lock = Lock()
+        given = state
+        if state is None:
+            state = self._compile_state()
+        self.columns, slots, rows = state
+        # Rows in output order: by participant, then by index.
+        self.slots: list[tuple[str, int]] = [tuple(slot) for slot in slots]
+        self.rows: list[list[tuple[int, int]]] = list(rows)
+        if len(self.slots) != len(self.rows):
+            raise ValueError("malformed plan state")
+        if given is not None:
+            self._check_state()
+        self.names: list[str] = list(dict.fromkeys(name for name, _ in self.slots))
+        self.indices: dict[str, int] = {}
+        for name, idx in self.slots:
+            self.indices[name] = idx
+
+    @property
+    def field(self) -> Field:
+        return field_for(self.mod)
+
+    def _compile_state(self) -> tuple:
+        self.columns = 1
+        self._rows: dict[Any, Form] = {}
+        self._compile(self.formula, {0: 1})
+        slots = sorted(self._rows, key=lambda slot: slot[1])
+        order = {name: i for i, name in enumerate(dict.fromkeys(name for name, _ in slots))}
+        slots.sort(key=lambda slot: order[slot[0]])
+        return self.columns, slots, [sorted(self._rows[slot].items()) for slot in slots]
+
+    def _check_state(self) -> None:
+        # A state loaded from elsewhere must at least have the shape of the formula
+        columns, slots = 1, set()
+
+        def visit(f: BooleanNode):
+            nonlocal columns
+            if f.kind == NodeKind.VAR:
+                slots.add(f.name)
+                return
+            if f.kind == NodeKind.AND:
+                columns += len(f.children) - 1
+            if f.kind == NodeKind.THRESHOLD:
+                columns += f.threshold - 1
+            for child in f.children:
+                visit(child)
+
+        visit(self.formula)
+        if self.columns != columns or len(self.slots) != len(slots) or set(self.slots) != slots:
+            raise ValueError("plan state doesn't match the formula")
+        for row in self.rows:
+            if not all(0 <= col < columns and 0 <= coef < self.mod for col, coef in row):
+                raise ValueError("plan state doesn't match the formula")
+
+    def state(self) -> tuple:
+        """Compiled matrix in plain containers, which `SplitPlan(conf, formula, state)` accepts back."""
+        return self.columns, self.slots, self.rows
+
+    def _fresh(self) -> int:
+        self.columns += 1
+        return self.columns - 1
+
+    def _combine(self, *terms: tuple[int, Form]) -> Form:
+        res = {}
+        for coef, form in terms:
+            for col, val in form.items():
+                res[col] = (res.get(col, 0) + coef * val) % self.mod
+        return {col: val for col, val in res.items() if val}
+
+    def _compile(self, f: BooleanNode, form: Form) -> None:
+        if f.kind == NodeKind.VAR:
+            self._rows[f.name] = form
+        elif f.kind == NodeKind.OR:
+            for child in f.children:
+                self._compile(child, form)
+        elif f.kind == NodeKind.AND:
+            summ = {}
+            for child in f.children[:-1]:
+                col = self._fresh()
+                summ[col] = 1
+                self._compile(child, {col: 1})
+            self._compile(f.children[-1], self._combine((1, form), (-1, summ)))
+        elif f.kind == NodeKind.THRESHOLD:
+            cols = [self._fresh() for _ in range(f.threshold - 1)]
+            for x, child in enumerate(f.children, 1):
+                coefs = dict(form)
+                xpow = 1
+                for col in cols:
+                    xpow = xpow * x % self.mod
+                    coefs[col] = xpow
+                self._compile(child, coefs)
+
+    def _matmul(self, inputs: list[list[int]]) -> list[list[int]]:
+        # Products are accumulated unreduced and reduced once per share.
+        result = []
+        size = len(inputs[0])
+        for row in self.rows:
+            acc = [0] * size
+            for col, coef in row:
+                acc = [a + coef * v for a, v in zip(acc, inputs[col])]
+            result.append(self.field.reduce_many(acc))
+        return result
+
+    def split_batch(self, secrets: Iterable[int], seed=None) -> PartBatch:
+        secrets = [s % self.mod for s in secrets]
+        batch = PartBatch.empty(self.indices, len(secrets), self.mod)
+        if not secrets:
+            return batch
+        math = MathBase(self.conf, seed=seed)
+        inputs = [secrets] + [math.rand(len(secrets)) for _ in range(self.columns - 1)]
+        for (name, idx), values in zip(self.slots, self._matmul(inputs)):
+            batch.set_column(name, idx, values)
+        return batch
+
+    def _recombine(self, f: BooleanNode, slots: frozenset[Any]) -> dict[Any, int] | None:
+        if f.kind == NodeKind.VAR:
+            return {f.name: 1} if f.name in slots else None
+        if f.kind == NodeKind.OR:
+            for child in f.children:
+                if (res := self._recombine(child, slots)) is not None:
+                    return res
+            return None
+        if f.kind == NodeKind.AND:
+            res = {}
+            for child in f.children:
+                sub = self._recombine(child, slots)
+                if sub is None:
+                    return None
+                res.update(sub)
+            return res
+        if f.kind == NodeKind.THRESHOLD:
+            xs, subs = [], []
+            for x, child in enumerate(f.children, 1):
+                if (sub := self._recombine(child, slots)) is not None:
+                    xs.append(x)
+                    subs.append(sub)
+                    if len(xs) == f.threshold:
+                        break
+            else:
+                return None
+            res = {}
+            for weight, sub in zip(lagrange_basis(xs, 0, self.mod), subs):
+                for slot, coef in sub.items():
+                    res[slot] = weight * coef % self.mod
+            return res
+
+    def recombination(self, slots: Iterable[tuple[str, int]]) -> dict[tuple[str, int], int] | None:
+        """Coefficients of the given `(name, index)` shares that sum up to the secret."""
+        slots = frozenset(slots)
+        with self._recombination_lock:
+            if slots in self._recombination:
+                self._recombination.move_to_end(slots)
+                return self._recombination[slots]
+        vector = self._recombine(self.formula, slots)
+        with self._recombination_lock:
+            self._recombination[slots] = vector
+            if len(self._recombination) > RECOMBINATION_CACHE_SIZE:
+                self._recombination.popitem(last=False)
+        return vector
+
+    def restore_batch(self, batch: PartBatch | list[list[Part]]) -> list[int | None]:
+        if not isinstance(batch, PartBatch):
+            return [self._restore_parts(parts) for parts in batch]
+        slots = frozenset((name, idx) for name, n in batch.indices.items() for idx in range(1, n + 1))
+        if not batch.has_missing:
+            # Every secret of the batch has the same shares available, so one
+            # recombination vector serves all of them.
+            vector = self.recombination(slots)
+            if vector is None:
+                return [None] * len(batch)
+            acc = [0] * len(batch)
+            for (name, idx), coef in vector.items():
+                acc = [a + coef * v for a, v in zip(acc, batch.column(name, idx))]
+            return self.field.reduce_many(acc)
+
+        # Otherwise one vector serves every group of secrets missing the same shares
+        groups: dict[frozenset, list[int]] = {}
+        for secret in range(len(batch)):
+            groups.setdefault(batch.missing(secret), []).append(secret)
+        columns = {}
+        result = [None] * len(batch)
+        for missing, secrets in groups.items():
+            vector = self.recombination(slots - missing)
+            if vector is None:
+                continue
+            acc = [0] * len(secrets)
+            for slot, coef in vector.items():
+                if slot not in columns:
+                    columns[slot] = batch.column(*slot)
+                col = columns[slot]
+                acc = [a + coef * col[i] for a, i in zip(acc, secrets)]
+            for i, val in zip(secrets, self.field.reduce_many(acc)):
+                result[i] = val
+        return result
+
+    def _restore_parts(self, parts: list[Part]) -> int | None:
+        given = {}
+        for part in parts:
+            for idx, val in enumerate(part.values, 1):
+                if val is not None:
+                    given[(part.name, idx)] = val
+        vector = self.recombination(given)
+        if vector is None:
+            return None
+        return self.field.reduce(sum(coef * given[slot] for slot, coef in vector.items()))
@@ -0,0 +1,351 @@
+from functools import lru_cache
+
+__all__ = (
+    "FAST_RESTORE_THRESHOLD",
+    "FAST_SPLIT_THRESHOLD",
+    "SubproductTree",
+    "batch_inverse",
+    "interpolate",
+    "lagrange_basis",
+    "multipoint_eval",
+    "ntt_mul",
+    "ntt_root",
+    "poly_divmod",
+    "poly_eval",
+    "poly_mul",
+    "range_tree",
+    "rs_decode",
+)
+
+# Polynomials are lists of coefficients modulo a prime, lowest degree first.
+# The zero polynomial is the empty list.
+
+# Threshold nodes with at least this many required children are split and
+# restored with the subproduct tree algorithms below. Both values are measured
+# crossovers of benchmarks/threshold.py for a 127-bit modulo; re-run it whenever
+# either path changes. They are read at call time, so they can be tuned here.
+FAST_SPLIT_THRESHOLD = 384
+FAST_RESTORE_THRESHOLD = 512
+
+# Below these sizes the quadratic algorithms win over the asymptotically fast ones.
+SCHOOLBOOK_CUTOFF = 32
+LEAF_SIZE = 8
+
+
+def _trim(a: list[int]) -> list[int]:
+    while a and not a[-1]:
+        a.pop()
+    return a
+
+
+def poly_eval(a: list[int], x: int, mod: int) -> int:
+    res = 0
+    for c in reversed(a):
+        res = (res * x + c) % mod
+    return res
+
+
+def _poly_add(a: list[int], b: list[int], mod: int) -> list[int]:
+    if len(a) < len(b):
+        a, b = b, a
+    res = a[:]
+    for i, c in enumerate(b):
+        res[i] = (res[i] + c) % mod
+    return _trim(res)
+
+
+def _poly_sub(a: list[int], b: list[int], mod: int) -> list[int]:
+    res = a + [0] * (len(b) - len(a))
+    for i, c in enumerate(b):
+        res[i] = (res[i] - c) % mod
+    return _trim(res)
+
+
+def _schoolbook(a: list[int], b: list[int], mod: int) -> list[int]:
+    res = [0] * (len(a) + len(b) - 1)
+    for i, x in enumerate(a):
+        if x:
+            for j, y in enumerate(b):
+                res[i + j] += x * y
+    return [c % mod for c in res]
+
+
+def _kronecker(a: list[int], b: list[int], mod: int) -> list[int]:
+    # Pack both polynomials into big integers with slots wide enough to never
+    # overflow, multiply them with the interpreter's bigint multiplication and unpack.
+    size = len(a) + len(b) - 1
+    width = (2 * (mod - 1).bit_length() + min(len(a), len(b)).bit_length() + 7) // 8
+    pa = int.from_bytes(b"".join(c.to_bytes(width, "little") for c in a), "little")
+    pb = int.from_bytes(b"".join(c.to_bytes(width, "little") for c in b), "little")
+    raw = (pa * pb).to_bytes(width * size, "little")
+    return [int.from_bytes(raw[i : i + width], "little") % mod for i in range(0, width * size, width)]
+
+
+@lru_cache(maxsize=64)
+def ntt_root(mod: int, size: int) -> int | None:
+    """Primitive `size`-th root of unity modulo prime `mod`, if there is one."""
+    if size & (size - 1) or (mod - 1) % size:
+        return None
+    if size == 1:
+        return 1
+    for g in range(2, min(mod, 1000)):
+        w = pow(g, (mod - 1) // size, mod)
+        if pow(w, size // 2, mod) == mod - 1:
+            return w
+    return None
+
+
+def _ntt(a: list[int], root: int, mod: int) -> list[int]:
+    n = len(a)
+    j = 0
+    for i in range(1, n):
+        bit = n >> 1
+        while j & bit:
+            j ^= bit
+            bit >>= 1
+        j |= bit
+        if i < j:
+            a[i], a[j] = a[j], a[i]
+
+    length = 2
+    while length <= n:
+        half = length // 2
+        step = pow(root, n // length, mod)
+        ws = [1] * half
+        for i in range(1, half):
+            ws[i] = ws[i - 1] * step % mod
+        for start in range(0, n, length):
+            mid = start + half
+            lo = a[start:mid]
+            hi = [x * w % mod for x, w in zip(a[mid : start + length], ws)]
+            a[start:mid] = [(u + v) % mod for u, v in zip(lo, hi)]
+            a[mid : start + length] = [(u - v) % mod for u, v in zip(lo, hi)]
+        length <<= 1
+    return a
+
+
+def ntt_mul(a: list[int], b: list[int], mod: int) -> list[int]:
+    """Product via the number theoretic transform, for primes with `2^e | mod - 1`.
+
+    Interpreted butterflies lose to the bigint multiplication used by `poly_mul`
+    at every size (see benchmarks/threshold.py), so this is kept for moduli
+    callers know to be NTT-friendly and for cross-checking.
+    """
+    if not a or not b:
+        return []
+    n = len(a) + len(b) - 1
+    size = 1 << (n - 1).bit_length()
+    root = ntt_root(mod, size)
+    if root is None:
+        raise ValueError(f"modulo doesn't have a root of unity of order {size}")
+    fa = _ntt(a + [0] * (size - len(a)), root, mod)
+    fb = _ntt(b + [0] * (size - len(b)), root, mod)
+    prod = _ntt([x * y % mod for x, y in zip(fa, fb)], pow(root, -1, mod), mod)
+    scale = pow(size, -1, mod)
+    return _trim([c * scale % mod for c in prod[:n]])
+
+
+def poly_mul(a: list[int], b: list[int], mod: int) -> list[int]:
+    if not a or not b:
+        return []
+    if min(len(a), len(b)) <= SCHOOLBOOK_CUTOFF:
+        return _trim(_schoolbook(a, b, mod))
+    return _trim(_kronecker(a, b, mod))
+
+
+def batch_inverse(values: list[int], mod: int) -> list[int]:
+    """Inverses of all (non-zero) `values` with a single modular inversion."""
+    prefix = [1] * (len(values) + 1)
+    for i, v in enumerate(values):
+        prefix[i + 1] = prefix[i] * v % mod
+    acc = pow(prefix[-1], -1, mod)
+    res = [0] * len(values)
+    for i in range(len(values) - 1, -1, -1):
+        res[i] = prefix[i] * acc % mod
+        acc = acc * values[i] % mod
+    return res
+
+
+def _series_inverse(f: list[int], n: int, mod: int) -> list[int]:
+    # Newton iteration: g <- g * (2 - f * g) doubles the precision every step.
+    g = [pow(f[0], -1, mod)]
+    prec = 1
+    while prec < n:
+        prec = min(2 * prec, n)
+        e = poly_mul(f[:prec], g, mod)[:prec]
+        e = [(-c) % mod for c in e] + [0] * (prec - len(e))
+        e[0] = (e[0] + 2) % mod
+        g = poly_mul(g, e, mod)[:prec]
+    return g
+
+
+def _long_divmod(a: list[int], b: list[int], mod: int) -> tuple[list[int], list[int]]:
+    rem = a[:]
+    inv = pow(b[-1], -1, mod)
+    quot = [0] * (len(a) - len(b) + 1)
+    for i in range(len(quot) - 1, -1, -1):
+        q = rem[i + len(b) - 1] * inv % mod
+        quot[i] = q
+        if q:
+            for j, c in enumerate(b):
+                rem[i + j] = (rem[i + j] - q * c) % mod
+    return _trim(quot), _trim(rem[: len(b) - 1])
+
+
+def poly_divmod(a: list[int], b: list[int], mod: int, inv_rev: list[int] = None) -> tuple[list[int], list[int]]:
+    """Quotient and remainder of `a` by non-zero `b`.
+
+    `inv_rev` may hold a precomputed inverse of reversed `b` as a power series,
+    at least `len(a) - len(b) + 1` terms long.
+    """
+    if len(a) < len(b):
+        return [], a[:]
+    m = len(a) - len(b) + 1
+    if m <= SCHOOLBOOK_CUTOFF or len(b) <= SCHOOLBOOK_CUTOFF:
+        return _long_divmod(a, b, mod)
+    if inv_rev is None or len(inv_rev) < m:
+        inv_rev = _series_inverse(b[::-1], m, mod)
+    q = poly_mul(a[::-1][:m], inv_rev[:m], mod)[:m]
+    q = q + [0] * (m - len(q))
+    q = _trim(q[::-1])
+    r = _poly_sub(a[: len(b) - 1], poly_mul(q, b, mod)[: len(b) - 1], mod)
+    return q, r
+
+
+class SubproductTree:
+    """Products of `(x - x_i)` over a balanced binary tree of the points `xs`.
+
+    Gives quasi-linear multipoint evaluation and interpolation.
+    """
+
+    def __init__(self, xs: list[int], mod: int) -> None:
+        if not xs:
+            raise ValueError("at least one point is required")
+        self.xs = [x % mod for x in xs]
+        self.mod = mod
+        level = [[-x % mod, 1] for x in self.xs]
+        spans = [(i, i + 1) for i in range(len(xs))]
+        self._levels = [level]
+        self._spans = [spans]
+        while len(level) > 1:
+            level = [
+                poly_mul(level[i], level[i + 1], mod) if i + 1 < len(level) else level[i]
+                for i in range(0, len(level), 2)
+            ]
+            spans = [
+                (spans[i][0], spans[min(i + 1, len(spans) - 1)][1]) for i in range(0, len(spans), 2)
+            ]
+            self._levels.append(level)
+            self._spans.append(spans)
+        self._inverses = {}
+
+    @property
+    def root(self) -> list[int]:
+        return self._levels[-1][0]
+
+    def _rem(self, a: list[int], level: int, j: int) -> list[int]:
+        m = self._levels[level][j]
+        need = len(a) - len(m) + 1
+        if need <= 0:
+            return a
+        inv = self._inverses.get((level, j))
+        if inv is None or len(inv) < need:
+            inv = _series_inverse(m[::-1], max(need, len(m)), self.mod)
+            self._inverses[(level, j)] = inv
+        return poly_divmod(a, m, self.mod, inv)[1]
+
+    def _is_carried(self, level: int, j: int) -> bool:
+        return 2 * j + 1 >= len(self._levels[level - 1])
+
+    def _down(self, level: int, j: int, rem: list[int], out: list[int]) -> None:
+        start, stop = self._spans[level][j]
+        if level == 0 or stop - start <= LEAF_SIZE or len(rem) <= 1:
+            for i in range(start, stop):
+                out[i] = poly_eval(rem, self.xs[i], self.mod)
+            return
+        if self._is_carried(level, j):
+            self._down(level - 1, 2 * j, rem, out)
+            return
+        for child in (2 * j, 2 * j + 1):
+            self._down(level - 1, child, self._rem(rem, level - 1, child), out)
+
+    def evaluate(self, poly: list[int]) -> list[int]:
+        out = [0] * len(self.xs)
+        top = len(self._levels) - 1
+        self._down(top, 0, self._rem(_trim(poly[:]), top, 0), out)
+        return out
+
+    def _combine(self, level: int, j: int, weights: list[int]) -> list[int]:
+        if level == 0:
+            return [weights[j]] if weights[j] else []
+        if self._is_carried(level, j):
+            return self._combine(level - 1, 2 * j, weights)
+        left = self._combine(level - 1, 2 * j, weights)
+        right = self._combine(level - 1, 2 * j + 1, weights)
+        below = self._levels[level - 1]
+        return _poly_add(
+            poly_mul(left, below[2 * j + 1], self.mod),
+            poly_mul(right, below[2 * j], self.mod),
+            self.mod,
+        )
+
+    def interpolate(self, ys: list[int]) -> list[int]:
+        """The unique polynomial of degree below `len(xs)` passing through `(xs, ys)`."""
+        if len(ys) != len(self.xs):
+            raise ValueError("number of values doesn't match number of points")
+        root = self.root
+        derivative = _trim([i * c % self.mod for i, c in enumerate(root)][1:])
+        denominators = self.evaluate(derivative)
+        if not all(denominators):
+            raise ValueError("interpolation points must be distinct")
+        weights = [y * w % self.mod for y, w in zip(ys, batch_inverse(denominators, self.mod))]
+        return self._combine(len(self._levels) - 1, 0, weights)
+
+
+@lru_cache(maxsize=32)
+def range_tree(n: int, mod: int) -> SubproductTree:
+    """Tree over the points `0..n`, which every threshold node with `n` children uses."""
+    return SubproductTree(list(range(n + 1)), mod)
+
+
+def multipoint_eval(poly: list[int], xs: list[int], mod: int) -> list[int]:
+    return SubproductTree(xs, mod).evaluate(poly)
+
+
+def interpolate(xs: list[int], ys: list[int], mod: int) -> list[int]:
+    return SubproductTree(xs, mod).interpolate(ys)
+
+
+def lagrange_basis(xs: list[int], at: int, mod: int) -> list[int]:
+    """Weights `w` such that `sum(w[i] * f(xs[i])) == f(at)` for any `f` of degree below `len(xs)`."""
+    xs = [x % mod for x in xs]
+    at %= mod
+    if at in xs:
+        return [int(x == at) for x in xs]
+    tree = SubproductTree(xs, mod)
+    root = tree.root
+    derivative = _trim([i * c % mod for i, c in enumerate(root)][1:])
+    denominators = [d * (at - x) % mod for d, x in zip(tree.evaluate(derivative), xs)]
+    if not all(denominators):
+        raise ValueError("interpolation points must be distinct")
+    numerator = poly_eval(root, at, mod)
+    return [numerator * d % mod for d in batch_inverse(denominators, mod)]
+
+
+def rs_decode(xs: list[int], ys: list[int], k: int, mod: int) -> list[int] | None:
+    """Polynomial of degree below `k` through all but at most `(len(xs) - k) // 2` of the points.
+
+    Gao's Reed-Solomon decoder. Returns `None` when there are too many errors to correct.
+    """
+    n = len(xs)
+    tree = SubproductTree(xs, mod)
+    r0, r1 = tree.root, tree.interpolate(ys)
+    v0, v1 = [], [1]
+    while 2 * (len(r1) - 1) >= n + k:
+        q, r = poly_divmod(r0, r1, mod)
+        r0, r1 = r1, r
+        v0, v1 = v1, _poly_sub(v0, poly_mul(q, v1, mod), mod)
+    f, rem = poly_divmod(r1, v1, mod)
+    if rem or len(f) > k:
+        return None
+    return f
@@ -0,0 +1,426 @@
+"""Local split/restore daemon speaking the binary share format.
+
+Every request and response is a frame: a little-endian `u32` length and a payload.
+A request payload is `u8` operation, `u32` length of the serialized configuration,
+the configuration itself and a body:
+
+* `SPLIT` takes secrets and returns a `PartBatch` (see `PartBatch.to_bytes`);
+* `RESTORE` takes a `PartBatch` and returns secrets;
+* `STATS` takes nothing and returns the server metrics as JSON.
+
+Secrets are `u64` count, `u16` limbs, one presence byte per secret and the values
+as little-endian 64-bit limbs. A response payload is a status byte, followed by the
+body or by a UTF-8 error message.
+
+Run the server with `python -m secret_sharing.service --unix PATH` or `--port PORT`.
+"""
+
+from array import array
+from bisect import bisect_left
+from collections import Counter, OrderedDict
+from concurrent.futures import Executor
+from typing import Any
+import argparse
+import asyncio
+import json
+import struct
+import sys
+import time
+
+from . import Configuration, Part
+from .batch import _MASK, PartBatch, _limbs
+from .engine import Engine
+
+__all__ = ("Histogram", "Metrics", "ShareClient", "ShareServer")
+
+SPLIT, RESTORE, STATS = 1, 2, 3
+_OPS = {SPLIT: "split", RESTORE: "restore", STATS: "stats"}
+_OK, _ERROR = 0, 1
+
+_FRAME = struct.Struct("<I")
+_REQUEST = struct.Struct("<BI")  # operation, configuration length
+_INTS = struct.Struct("<QH")  # count, limbs
+MAX_FRAME = 1 << 30
+
+
+def _pack_ints(values: list[int | None], limbs: int) -> bytes:
+    col = array("Q", bytes(8 * len(values) * limbs))
+    for i in range(limbs):
+        shift = 64 * i
+        col[i::limbs] = array("Q", [0 if v is None else (v >> shift) & _MASK for v in values])
+    if sys.byteorder != "little":
+        col.byteswap()
+    present = bytes(v is not None for v in values)
+    return _INTS.pack(len(values), limbs) + present + col.tobytes()
+
+
+def _unpack_ints(data: bytes) -> list[int | None]:
+    try:
+        count, limbs = _INTS.unpack_from(data)
+    except struct.error:
+        raise ValueError("truncated secrets") from None
+    pos = _INTS.size + count
+    if limbs < 1 or len(data) != pos + 8 * count * limbs:
+        raise ValueError("malformed secrets")
+    col = array("Q")
+    col.frombytes(data[pos:])
+    if sys.byteorder != "little":
+        col.byteswap()
+    values = col[::limbs].tolist()
+    for i in range(1, limbs):
+        shift = 64 * i
+        values = [v | (limb << shift) for v, limb in zip(values, col[i::limbs])]
+    return [v if present else None for v, present in zip(values, data[_INTS.size : pos])]
+
+
+async def _read_frame(reader: asyncio.StreamReader) -> bytes:
+    (length,) = _FRAME.unpack(await reader.readexactly(_FRAME.size))
+    if length > MAX_FRAME:
+        raise ValueError("frame is too large")
+    return await reader.readexactly(length)
+
+
+def _write_frame(writer: asyncio.StreamWriter, payload: bytes) -> None:
+    writer.write(_FRAME.pack(len(payload)) + payload)
+
+
+class Histogram:
+    """Latency histogram over `buckets` doubling buckets starting at `lowest` seconds."""
+
+    def __init__(self, lowest: float = 1e-5, buckets: int = 24) -> None:
+        self.bounds = [lowest * 2**i for i in range(buckets)]
+        self.counts = [0] * (buckets + 1)
+        self.count = 0
+        self.total = 0.0
+
+    def record(self, seconds: float) -> None:
+        self.counts[bisect_left(self.bounds, seconds)] += 1
+        self.count += 1
+        self.total += seconds
+
+    def quantile(self, q: float) -> float | None:
+        """Upper bound of the bucket holding the `q` quantile, `None` if above all buckets."""
+        if not self.count:
+            return 0.0
+        rank = q * self.count
+        seen = 0
+        for bound, count in zip(self.bounds, self.counts):
+            seen += count
+            if seen >= rank:
+                return bound
+        return None
+
+    def snapshot(self) -> dict[str, Any]:
+        buckets = [[bound, count] for bound, count in zip(self.bounds + [None], self.counts) if count]
+        return {
+            "count": self.count,
+            "sum": self.total,
+            "p50": self.quantile(0.5),
+            "p99": self.quantile(0.99),
+            "buckets": buckets,
+        }
+
+
+class Metrics:
+    """Counters and latency histograms of a `ShareServer`.
+
+    Counters are `<op>.requests`, `<op>.secrets`, `<op>.batches` and `errors`.
+    `latency` is measured per request from receiving it to having the response,
+    `batch_latency` per coalesced call into the engine.
+    """
+
+    def __init__(self) -> None:
+        self.started = time.monotonic()
+        self.counters: Counter[str] = Counter()
+        self.latency = {op: Histogram() for op in ("split", "restore")}
+        self.batch_latency = {op: Histogram() for op in ("split", "restore")}
+
+    def snapshot(self) -> dict[str, Any]:
+        uptime = time.monotonic() - self.started
+        return {
+            "uptime": uptime,
+            "counters": dict(self.counters),
+            "throughput": {op: self.counters[f"{op}.secrets"] / uptime for op in self.latency},
+            "latency": {op: hist.snapshot() for op, hist in self.latency.items()},
+            "batch_latency": {op: hist.snapshot() for op, hist in self.batch_latency.items()},
+        }
+
+
+class _Pending:
+    __slots__ = ("engine", "op", "items", "size", "timer")
+
+    def __init__(self, engine: Engine, op: int) -> None:
+        self.engine = engine
+        self.op = op
+        self.items: list[tuple[Any, int, asyncio.Future]] = []
+        self.size = 0
+        self.timer: asyncio.TimerHandle | None = None
+
+
+class ShareServer:
+    """Asyncio server splitting and restoring for many local clients.
+
+    Compiled configurations are kept in memory, up to `max_configurations` of
+    them. Concurrent requests for the same configuration are coalesced: a
+    request waits up to `max_delay` seconds for others, or until `max_batch`
+    secrets are pending, and then all of them go to a single `split_batch` or
+    `restore_batch` call, run in `executor`. Restore requests are only coalesced
+    with requests having the same participants.
+
+    Requests on one connection are answered in order, so clients should use a
+    connection per concurrent request, as `ShareClient` does.
+    """
+
+    def __init__(
+        self,
+        max_batch: int = 4096,
+        max_delay: float = 0.001,
+        max_configurations: int = 64,
+        executor: Executor = None,
+    ) -> None:
+        self.max_batch = max_batch
+        self.max_delay = max_delay
+        self.max_configurations = max_configurations
+        self.executor = executor
+        self.metrics = Metrics()
+        self._engines: OrderedDict[bytes, asyncio.Future] = OrderedDict()
+        self._pending: dict[tuple, _Pending] = {}
+        self._tasks: set[asyncio.Task] = set()
+        self._server: asyncio.AbstractServer | None = None
+
+    async def start(self, path: str = None, host: str = "127.0.0.1", port: int = 0) -> None:
+        """Listen on the Unix socket `path`, or on TCP `host:port` if no path is given."""
+        if path is not None:
+            self._server = await asyncio.start_unix_server(self._handle, path)
+        else:
+            self._server = await asyncio.start_server(self._handle, host, port)
+
+    @property
+    def address(self) -> Any:
+        return self._server.sockets[0].getsockname()
+
+    async def serve_forever(self) -> None:
+        await self._server.serve_forever()
+
+    async def close(self) -> None:
+        if self._server is not None:
+            self._server.close()
+            await self._server.wait_closed()
+        if self._tasks:
+            await asyncio.gather(*self._tasks, return_exceptions=True)
+
+    async def __aenter__(self) -> "ShareServer":
+        return self
+
+    async def __aexit__(self, *exc) -> None:
+        await self.close()
+
+    async def _engine(self, key: bytes) -> Engine:
+        if key in self._engines:
+            self._engines.move_to_end(key)
+        else:
+            loop = asyncio.get_running_loop()
+            self._engines[key] = loop.run_in_executor(
+                self.executor, lambda: Engine(Configuration.deserialize(key))
+            )
+            while len(self._engines) > self.max_configurations:
+                self._engines.popitem(last=False)
+        future = self._engines[key]
+        try:
+            return await asyncio.shield(future)
+        except Exception:
+            if self._engines.get(key) is future:
+                del self._engines[key]
+            raise
+
+    async def _submit(self, key: tuple, engine: Engine, op: int, payload: Any, size: int) -> Any:
+        loop = asyncio.get_running_loop()
+        if (pending := self._pending.get(key)) is None:
+            pending = self._pending[key] = _Pending(engine, op)
+            pending.timer = loop.call_later(self.max_delay, self._flush, key)
+        future = loop.create_future()
+        pending.items.append((payload, size, future))
+        pending.size += size
+        if pending.size >= self.max_batch:
+            self._flush(key)
+        return await future
+
+    def _flush(self, key: tuple) -> None:
+        pending = self._pending.pop(key)
+        pending.timer.cancel()
+        task = asyncio.ensure_future(self._run(pending))
+        self._tasks.add(task)
+        task.add_done_callback(self._tasks.discard)
+
+    async def _run(self, pending: _Pending) -> None:
+        loop = asyncio.get_running_loop()
+        name = _OPS[pending.op]
+        start = time.perf_counter()
+        bounds, pos = [], 0
+        for _, size, _ in pending.items:
+            bounds.append((pos, pos + size))
+            pos += size
+        try:
+            if pending.op == SPLIT:
+                secrets = [secret for payload, _, _ in pending.items for secret in payload]
+                batch = await loop.run_in_executor(self.executor, pending.engine.split_batch, secrets)
+                results = [batch.slice(start, stop) for start, stop in bounds]
+            else:
+                batch = PartBatch.concat([payload for payload, _, _ in pending.items])
+                restored = await loop.run_in_executor(self.executor, pending.engine.restore_batch, batch)
+                results = [restored[start:stop] for start, stop in bounds]
+        except Exception as e:
+            for _, _, future in pending.items:
+                if not future.done():
+                    future.set_exception(e)
+            return
+        self.metrics.counters[f"{name}.batches"] += 1
+        self.metrics.batch_latency[name].record(time.perf_counter() - start)
+        for (_, _, future), result in zip(pending.items, results):
+            if not future.done():
+                future.set_result(result)
+
+    async def _respond(self, request: bytes) -> bytes:
+        start = time.perf_counter()
+        try:
+            op, length = _REQUEST.unpack_from(request)
+            key = request[_REQUEST.size : _REQUEST.size + length]
+            body = request[_REQUEST.size + length :]
+            if op == STATS:
+                return bytes([_OK]) + json.dumps(self.metrics.snapshot()).encode("utf-8")
+            if op not in _OPS:
+                raise ValueError(f"unknown operation {op}")
+            engine = await self._engine(key)
+            if op == SPLIT:
+                secrets = _unpack_ints(body)
+                if None in secrets:
+                    raise ValueError("missing secret to split")
+                size = len(secrets)
+                batch = await self._submit((key, op), engine, op, secrets, size)
+                body = batch.to_bytes()
+            else:
+                batch = PartBatch.from_bytes(body)
+                size = len(batch)
+                group = (key, op, tuple(batch.indices.items()), batch.limbs)
+                restored = await self._submit(group, engine, op, batch, size)
+                body = _pack_ints(restored, _limbs(engine.modulo))
+        except Exception as e:
+            self.metrics.counters["errors"] += 1
+            return bytes([_ERROR]) + str(e).encode("utf-8")
+        name = _OPS[op]
+        self.metrics.counters[f"{name}.requests"] += 1
+        self.metrics.counters[f"{name}.secrets"] += size
+        self.metrics.latency[name].record(time.perf_counter() - start)
+        return bytes([_OK]) + body
+
+    async def _handle(self, reader: asyncio.StreamReader, writer: asyncio.StreamWriter) -> None:
+        try:
+            while True:
+                try:
+                    request = await _read_frame(reader)
+                except asyncio.IncompleteReadError:
+                    break
+                _write_frame(writer, await self._respond(request))
+                await writer.drain()
+        except (ConnectionError, ValueError):
+            pass
+        finally:
+            writer.close()
+
+
+class ShareClient:
+    """Client of a `ShareServer` with a pool of up to `size` connections.
+
+    May be shared between the tasks of one event loop: every call takes an idle
+    connection, or opens a new one while there are fewer than `size`.
+    """
+
+    def __init__(self, path: str = None, host: str = "127.0.0.1", port: int = None, size: int = 8) -> None:
+        if path is None and port is None:
+            raise ValueError("either `path` or `port` is required")
+        self.path = path
+        self.host = host
+        self.port = port
+        self.size = size
+        self._idle: list[tuple[asyncio.StreamReader, asyncio.StreamWriter]] = []
+        self._slots = asyncio.Semaphore(size)
+
+    async def _connect(self) -> tuple[asyncio.StreamReader, asyncio.StreamWriter]:
+        if self.path is not None:
+            return await asyncio.open_unix_connection(self.path)
+        return await asyncio.open_connection(self.host, self.port)
+
+    async def _call(self, op: int, conf: Configuration | None, body: bytes = b"") -> bytes:
+        key = conf.serialize() if conf is not None else b""
+        async with self._slots:
+            reader, writer = self._idle.pop() if self._idle else await self._connect()
+            try:
+                _write_frame(writer, _REQUEST.pack(op, len(key)) + key + body)
+                await writer.drain()
+                response = await _read_frame(reader)
+            except BaseException:
+                writer.close()
+                raise
+            self._idle.append((reader, writer))
+        if response[0] == _ERROR:
+            raise ValueError(response[1:].decode("utf-8"))
+        return response[1:]
+
+    async def split_batch(self, conf: Configuration, secrets: list[int]) -> PartBatch:
+        body = _pack_ints([s % conf.modulo for s in secrets], _limbs(conf.modulo))
+        return PartBatch.from_bytes(await self._call(SPLIT, conf, body))
+
+    async def restore_batch(self, conf: Configuration, batch: PartBatch | list[list[Part]]) -> list[int | None]:
+        if not isinstance(batch, PartBatch):
+            batch = PartBatch.from_parts(batch, conf.modulo)
+        return _unpack_ints(await self._call(RESTORE, conf, batch.to_bytes()))
+
+    async def split(self, conf: Configuration, secret: int) -> list[Part]:
+        return (await self.split_batch(conf, [secret]))[0].parts()
+
+    async def restore(self, conf: Configuration, parts: list[Part]) -> int | None:
+        return (await self.restore_batch(conf, [parts]))[0]
+
+    async def stats(self) -> dict[str, Any]:
+        return json.loads(await self._call(STATS, None))
+
+    async def close(self) -> None:
+        idle, self._idle = self._idle, []
+        for _, writer in idle:
+            writer.close()
+        for _, writer in idle:
+            try:
+                await writer.wait_closed()
+            except ConnectionError:
+                pass
+
+    async def __aenter__(self) -> "ShareClient":
+        return self
+
+    async def __aexit__(self, *exc) -> None:
+        await self.close()
+
+
+async def _serve(args: argparse.Namespace) -> None:
+    server = ShareServer(max_batch=args.max_batch, max_delay=args.max_delay)
+    await server.start(path=args.unix, host=args.host, port=args.port)
+    print(f"listening on {server.address}", file=sys.stderr)
+    async with server:
+        await server.serve_forever()
+
+
+def main(argv: list[str] = None) -> None:
+    parser = argparse.ArgumentParser(description="Split/restore daemon.")
+    parser.add_argument("--unix", help="Unix socket path")
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=0)
+    parser.add_argument("--max-batch", type=int, default=4096)
+    parser.add_argument("--max-delay", type=float, default=0.001)
+    try:
+        asyncio.run(_serve(parser.parse_args(argv)))
+    except KeyboardInterrupt:
+        pass
+
+
+if __name__ == "__main__":
+    main()
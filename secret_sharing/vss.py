@@ -0,0 +1,268 @@
+from base64 import urlsafe_b64decode, urlsafe_b64encode
+from dataclasses import dataclass, field
+from functools import cached_property, lru_cache
+from typing import Any
+import json
+import secrets
+
+from .boolean import BooleanNode, NodeKind
+from .field import is_probable_prime
+
+__all__ = ("MIN_ORDER", "Commitments", "FixedBase", "Group", "multi_exp")
+
+# Feldman commitments publish `g^secret` and `g^share`, which hide them only as
+# long as discrete logarithms in the order-`q` subgroup are infeasible. Pollard's
+# rho takes about `sqrt(q)` steps, so the configuration modulo must be at least
+# 2^200 for about 100 bits of security (the `p25519` and `mersenne521` presets).
+# The group modulus `p` must resist index calculus too: keep `bits` >= 2048.
+MIN_ORDER = 2**200
+
+
+def _check_order(q: int) -> None:
+    if q < MIN_ORDER:
+        raise ValueError("modulo is too small for commitments to hide the secret, at least 2^200 is required")
+
+
+class FixedBase:
+    """Powers of a fixed `base` modulo `p` from a table of `base^(d * 2^(window * i))`.
+
+    An exponentiation then costs one multiplication per window and no squarings.
+    """
+
+    def __init__(self, base: int, p: int, bits: int, window: int = 6) -> None:
+        self.p = p
+        self.window = window
+        self.mask = (1 << window) - 1
+        self.table = []
+        for _ in range((bits + window - 1) // window):
+            row = [1] * (1 << window)
+            for d in range(1, 1 << window):
+                row[d] = row[d - 1] * base % p
+            self.table.append(row)
+            base = row[-1] * base % p
+
+    def pow(self, e: int) -> int:
+        res = 1
+        for row in self.table:
+            if not e:
+                break
+            if d := e & self.mask:
+                res = res * row[d] % self.p
+            e >>= self.window
+        if e:
+            raise ValueError("exponent is larger than the table")
+        return res
+
+
+def _window_tables(bases: list[int], p: int, window: int) -> list[list[int]]:
+    tables = []
+    for b in bases:
+        row = [1] * (1 << window)
+        for d in range(1, 1 << window):
+            row[d] = row[d - 1] * b % p
+        tables.append(row)
+    return tables
+
+
+def multi_exp(bases: list[int], exps: list[int], p: int, window: int = 4, tables: list[list[int]] = None) -> int:
+    """`prod(b^e for b, e in zip(bases, exps)) % p` with shared squarings (Straus' method).
+
+    `tables` may hold the `b^d` for `d < 2^window` of every base, precomputed for reuse.
+    """
+    if tables is None:
+        tables = _window_tables(bases, p, window)
+    mask = (1 << window) - 1
+    top = max((e.bit_length() for e in exps), default=0)
+    res = 1
+    for shift in range((top + window - 1) // window * window - window, -1, -window):
+        for _ in range(window):
+            res = res * res % p
+        for row, e in zip(tables, exps):
+            if d := (e >> shift) & mask:
+                res = res * row[d] % p
+    return res
+
+
+@dataclass(frozen=True)
+class Group:
+    """Subgroup of prime order `q` in the multiplicative group modulo prime `p = c * q + 1`."""
+
+    p: int
+    q: int
+    g: int
+
+    def __post_init__(self) -> None:
+        if not (is_probable_prime(self.q) and is_probable_prime(self.p) and (self.p - 1) % self.q == 0):
+            raise ValueError("invalid group: p and q must be primes with q dividing p - 1")
+        if not 1 < self.g < self.p or pow(self.g, self.q, self.p) != 1:
+            raise ValueError("invalid group: g must generate the subgroup of order q")
+
+    @classmethod
+    @lru_cache(maxsize=16)
+    def for_order(cls, q: int, bits: int = 2048) -> "Group":
+        """Deterministic group of order `q` (the configuration modulo) with a `bits`-bit modulus."""
+        if not is_probable_prime(q):
+            raise ValueError("group order must be prime")
+        c = max(2, (1 << (bits - 1)) // q)
+        c += c & 1
+        while not is_probable_prime(c * q + 1):
+            c += 2
+        p = c * q + 1
+        for h in range(2, p):
+            g = pow(h, c, p)
+            if g != 1:
+                return cls(p=p, q=q, g=g)
+
+    @cached_property
+    def _g_table(self) -> FixedBase:
+        return FixedBase(self.g, self.p, self.q.bit_length())
+
+    def commit(self, value: int) -> int:
+        return self._g_table.pow(value % self.q)
+
+    def contains(self, c: int) -> bool:
+        """Whether `c` lies in the subgroup of order `q`."""
+        return 0 < c < self.p and pow(c, self.q, self.p) == 1
+
+
+@dataclass
+class Commitments:
+    """Feldman commitments `g^a_j` to the polynomial coefficients of every threshold node.
+
+    Nodes are listed in preorder. Only shares held directly by children of threshold
+    nodes can be checked against them. The configuration modulo must be at least
+    `MIN_ORDER`, or the commitments reveal the secret.
+
+    Nothing the dealer sends is trusted: `verify` rejects commitments whose group
+    order isn't the configuration modulo, whose polynomials have the wrong degree,
+    or whose values lie outside the group.
+    """
+
+    group: Group
+    nodes: list[list[int]]
+    _tables: dict = field(default_factory=dict, init=False, repr=False, compare=False)
+    _validated: set = field(default_factory=set, init=False, repr=False, compare=False)
+
+    @classmethod
+    def commit(cls, group: Group, formula: BooleanNode, polys: dict[BooleanNode, list[int]]) -> "Commitments":
+        _check_order(group.q)
+        nodes = []
+
+        def visit(f: BooleanNode):
+            if f.kind == NodeKind.THRESHOLD:
+                nodes.append([group.commit(c) for c in polys[f]])
+            if f.kind != NodeKind.VAR:
+                for child in f.children:
+                    visit(child)
+
+        visit(formula)
+        return cls(group=group, nodes=nodes)
+
+    def serialize(self) -> str:
+        data = {"p": self.group.p, "q": self.group.q, "g": self.group.g, "nodes": self.nodes}
+        return urlsafe_b64encode(json.dumps(data).encode("utf-8"))
+
+    @classmethod
+    def deserialize(cls, s: str) -> "Commitments":
+        data = json.loads(urlsafe_b64decode(s).decode("utf-8"))
+        return cls(group=Group(p=data["p"], q=data["q"], g=data["g"]), nodes=data["nodes"])
+
+    def _validate(self, conf, formula: BooleanNode) -> None:
+        key = (conf.modulo, conf.formula)
+        if key in self._validated:
+            return
+        if self.group.q != conf.modulo:
+            raise ValueError("commitments are over a group of wrong order")
+        _check_order(self.group.q)
+        thresholds = []
+
+        def visit(f: BooleanNode):
+            if f.kind == NodeKind.THRESHOLD:
+                thresholds.append(f.threshold)
+            if f.kind != NodeKind.VAR:
+                for child in f.children:
+                    visit(child)
+
+        visit(formula)
+        if [len(node) for node in self.nodes] != thresholds:
+            raise ValueError("commitments don't match the threshold nodes of the configuration")
+        # The batch check is only sound in a group of prime order
+        if not all(self.group.contains(c) for node in self.nodes for c in node):
+            raise ValueError("commitment outside the group")
+        self._validated.add(key)
+
+    @staticmethod
+    def _positions(formula: BooleanNode) -> dict[Any, tuple[int, int]]:
+        # (name, idx) -> (threshold node, x) for variables directly under threshold nodes
+        positions = {}
+        counter = 0
+
+        def visit(f: BooleanNode):
+            nonlocal counter
+            if f.kind == NodeKind.VAR:
+                return
+            if f.kind == NodeKind.THRESHOLD:
+                node = counter
+                counter += 1
+                for x, child in enumerate(f.children, 1):
+                    if child.kind == NodeKind.VAR:
+                        positions[child.name] = (node, x)
+            for child in f.children:
+                visit(child)
+
+        visit(formula)
+        return positions
+
+    def _check(self, node: int, shares: list[tuple[Any, int, int]]) -> bool:
+        # Random linear combination of the checks `g^y == prod(C_j^(x^j))` of all
+        # shares: a single fixed-base exponentiation on the left and a single
+        # multi-exponentiation on the right.
+        q, p = self.group.q, self.group.p
+        if len(shares) == 1:
+            weights = [1]
+        else:
+            weights = [secrets.randbelow(min(q, 1 << 64) - 1) + 1 for _ in shares]
+        total = sum(r * y for r, (_, _, y) in zip(weights, shares)) % q
+        exps = [0] * len(self.nodes[node])
+        for r, (_, x, _) in zip(weights, shares):
+            xpow = r
+            for j in range(len(exps)):
+                exps[j] += xpow
+                xpow = xpow * x % q
+        if node not in self._tables:
+            self._tables[node] = _window_tables(self.nodes[node], p, 5)
+        exps = [e % q for e in exps]
+        return self.group.commit(total) == multi_exp(self.nodes[node], exps, p, 5, self._tables[node])
+
+    def _find_bad(self, node: int, shares: list[tuple[Any, int, int]]) -> set[str]:
+        # Bisect failing batches, costing O(errors * log(shares)) batch checks.
+        if self._check(node, shares):
+            return set()
+        if len(shares) == 1:
+            return {shares[0][0]}
+        mid = len(shares) // 2
+        return self._find_bad(node, shares[:mid]) | self._find_bad(node, shares[mid:])
+
+    def verify_share(self, conf, part) -> bool:
+        """Check the checkable values of a single `Part` of `conf`."""
+        return not self.verify(conf, [part])
+
+    def verify(self, conf, parts: list) -> set[str]:
+        """Names of participants among `parts` holding values inconsistent with the commitments.
+
+        Raises `ValueError` if the commitments themselves are invalid for `conf`.
+        """
+        formula = conf.make_formula()
+        self._validate(conf, formula)
+        positions = self._positions(formula)
+        by_node: dict[int, list[tuple[str, int, int]]] = {}
+        for part in parts:
+            for idx, val in enumerate(part.values, 1):
+                if val is not None and (part.name, idx) in positions:
+                    node, x = positions[(part.name, idx)]
+                    by_node.setdefault(node, []).append((part.name, x, val))
+
+        bad = set()
+        for node, shares in by_node.items():
+            bad |= self._find_bad(node, shares)
+        return bad
@@ -17,7 +17,7 @@ URL = "https://github.com/EPICOMM/secret-sharing-math"
 EMAIL = "secret-sharing@sldr.xyz"
 AUTHOR = "Ilia Konnov"
 REQUIRES_PYTHON = ">=3.9.0"
-VERSION = "0.1.0"
+VERSION = None
 
 # What packages are required for this module to be executed?
 REQUIRED = []
@@ -40,8 +40,13 @@ try:
 except FileNotFoundError:
     long_description = DESCRIPTION
 
+# Load the package's __version__.py module as a dictionary.
 about = {}
-about["__version__"] = VERSION
+if not VERSION:
+    with open(os.path.join(here, NAME, "__version__.py")) as f:
+        exec(f.read(), about)
+else:
+    about["__version__"] = VERSION
 
 
 class UploadCommand(Command):
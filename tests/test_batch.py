@@ -0,0 +1,88 @@
+import pytest
+
+from secret_sharing import Configuration, Part
+from secret_sharing.batch import PartBatch
+
+FORMULA = "(XXX & T2(x & y, b | c, d, e)) | (b & c & d & e)"
+
+
+@pytest.mark.parametrize("modulo", [101, 2**127 - 1, 2**521 - 1])
+def test_roundtrip(modulo):
+    conf = Configuration(modulo=modulo, formula=FORMULA)
+    batch = conf.split_batch(range(100), seed=0)
+    assert batch.limbs == max(1, (modulo.bit_length() + 63) // 64)
+    assert PartBatch.from_bytes(batch.to_bytes()) == batch
+    assert PartBatch.from_parts(batch.to_parts(), modulo) == batch
+    assert conf.restore_batch(PartBatch.from_bytes(batch.to_bytes())) == list(range(100))
+
+
+def test_views():
+    conf = Configuration(modulo=2**127 - 1, formula=FORMULA)
+    batch = conf.split_batch([42, 2**100], seed=0)
+    view = batch[-1]
+    assert view.secret == 1
+    assert view.values("b") == [batch.get("b", 1, 1), batch.get("b", 1, 2)]
+    assert batch.column("b", 2) == [batch[0].values("b")[1], view.values("b")[1]]
+    assert conf.restore(view) == 2**100
+    assert not hasattr(view, "__dict__")
+
+
+def test_select():
+    conf = Configuration(modulo=101, formula=FORMULA)
+    batch = conf.split_batch([42, 43, 44], seed=0)
+    assert conf.restore_batch(batch.select(["XXX", "c", "d"])) == [42, 43, 44]
+    assert conf.restore_batch(batch.select(["XXX", "x", "e"])) == [None] * 3
+    selected = batch.select(["XXX", "c", "d"])
+    assert selected == PartBatch.from_bytes(selected.to_bytes())
+    assert selected == PartBatch.from_parts(selected.to_parts(), 101)
+    assert selected != batch
+
+
+def test_set():
+    batch = PartBatch.empty({"a": 2}, size=2, modulo=2**127 - 1)
+    batch.set("a", 1, 2, 2**126 + 5)
+    assert batch.get("a", 1, 2) == 2**126 + 5
+    assert batch[1].parts() == [Part("a", [0, 2**126 + 5])]
+
+
+def test_malformed():
+    data = Configuration(modulo=101, formula="a & b").split_batch([1, 2]).to_bytes()
+    with pytest.raises(ValueError):
+        PartBatch.from_bytes(data[:-1])
+    with pytest.raises(ValueError):
+        PartBatch.from_bytes(data + b"\0")
+    with pytest.raises(ValueError):
+        PartBatch.from_bytes(b"XXXX" + data[4:])
+
+
+def test_slice_concat():
+    conf = Configuration(modulo=2**127 - 1, formula=FORMULA)
+    batch = conf.split_batch(range(10), seed=0)
+    parts = [batch.slice(0, 3), batch.slice(3, 3), batch.slice(3, 10)]
+    assert [len(part) for part in parts] == [3, 0, 7]
+    assert conf.restore_batch(parts[2]) == list(range(3, 10))
+    assert PartBatch.concat(parts) == batch
+    with pytest.raises(ValueError):
+        PartBatch.concat([batch, batch.select(["b", "c"])])
+
+
+def test_missing_shares():
+    conf = Configuration(modulo=101, formula=FORMULA)
+    splits = [conf.split(secret, seed=secret) for secret in range(1, 5)]
+    # b lost their first share in two splits, then also x in the last one
+    for parts in splits[2:]:
+        next(part for part in parts if part.name == "b").values[0] = None
+    next(part for part in splits[3] if part.name == "x").values[0] = None
+    batch = PartBatch.from_parts(splits, 101)
+    assert batch.has_missing
+    assert batch.missing(0) == frozenset()
+    assert batch.missing(3) == {("b", 1), ("x", 1)}
+    assert batch.get("b", 2, 1) is None
+    assert batch.to_parts() == splits
+    assert PartBatch.from_bytes(batch.to_bytes()) == batch
+    assert PartBatch.concat([batch.slice(0, 1), batch.slice(1, 4)]) == batch
+    assert conf.restore_batch(batch) == [conf.restore(parts) for parts in splits]
+    assert conf.restore(batch[2]) == 3
+
+    with pytest.raises(ValueError):
+        PartBatch.from_parts([[Part("a", ["1"])]], 101)
@@ -0,0 +1,87 @@
+import pytest
+
+from secret_sharing import Configuration
+from secret_sharing.cache import CompiledCache, set_default_cache
+from secret_sharing.plan import SplitPlan
+
+FORMULA = "(XXX & T2(x & y, b | c, d, e)) | (b & c & d & e)"
+
+
+@pytest.fixture
+def cache(tmp_path):
+    cache = CompiledCache(tmp_path)
+    set_default_cache(cache)
+    yield cache
+    set_default_cache(None)
+
+
+def test_cached_formula(cache):
+    conf = Configuration(modulo=101, formula=FORMULA)
+    assert conf.make_formula() == conf._make_formula()
+    assert len(list(cache.path.glob("*.formula.bin"))) == 1
+    assert not list(cache.path.glob("*.plan.bin"))
+
+    fresh = CompiledCache(cache.path)
+    assert fresh.formula(conf) == conf._make_formula()
+    assert conf.split(42, seed=0) == Configuration(modulo=101, formula=FORMULA).split(42, seed=0)
+
+
+def test_cached_plan(cache):
+    conf = Configuration(modulo=101, formula=FORMULA)
+    batch = conf.split_batch([42, 7], seed=0)
+    plan = CompiledCache(cache.path).plan(conf)
+    assert plan.state() == conf.plan().state()
+    assert plan.restore_batch(batch) == [42, 7]
+
+
+def test_key():
+    cache = CompiledCache("unused")
+    conf = Configuration(modulo=101, formula="a & b")
+    assert cache.key(conf) == cache.key(Configuration(modulo=101, formula="a & b"))
+    assert cache.key(conf) != cache.key(Configuration(modulo=103, formula="a & b"))
+    assert cache.key(conf) != cache.key(Configuration(modulo=101, formula="a & b", version=2))
+
+
+def test_corrupted_entry(cache):
+    conf = Configuration(modulo=101, formula=FORMULA)
+    conf.make_formula()
+    (file,) = cache.path.glob("*.formula.bin")
+    file.write_bytes(b"garbage")
+    assert CompiledCache(cache.path).formula(conf) == conf._make_formula()
+    assert file.read_bytes() != b"garbage"
+
+
+def test_unwritable_cache(tmp_path):
+    (tmp_path / "file").write_bytes(b"")
+    cache = CompiledCache(tmp_path / "file" / "cache")
+    set_default_cache(cache)
+    try:
+        conf = Configuration(modulo=101, formula=FORMULA)
+        assert conf.restore(conf.split(42, seed=0)) == 42
+        assert cache.plan(conf).restore_batch(conf.split_batch([7], seed=0)) == [7]
+    finally:
+        set_default_cache(None)
+
+
+def test_flipped_bit(cache):
+    conf = Configuration(modulo=101, formula=FORMULA)
+    cache.plan(conf)
+    (file,) = cache.path.glob("*.plan.bin")
+    data = bytearray(file.read_bytes())
+    data[-5] ^= 1
+    file.write_bytes(bytes(data))
+    plan = CompiledCache(cache.path).plan(conf)
+    assert plan.restore_batch(plan.split_batch([42, 7], seed=0)) == [42, 7]
+    assert file.read_bytes() != bytes(data)
+
+
+def test_plan_state_mismatch():
+    conf = Configuration(modulo=101, formula="T2(a, b, c)")
+    columns, slots, rows = SplitPlan(conf).state()
+    SplitPlan(conf, state=(columns, slots, rows))
+    with pytest.raises(ValueError):
+        SplitPlan(conf, state=(columns + 1, slots, rows))
+    with pytest.raises(ValueError):
+        SplitPlan(Configuration(modulo=101, formula="T2(a, b, d)"), state=(columns, slots, rows))
+    with pytest.raises(ValueError):
+        SplitPlan(conf, state=(columns, slots, [rows[0], rows[1], [(0, 1), (5, 1)]]))
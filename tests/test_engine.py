@@ -0,0 +1,51 @@
+from concurrent.futures import ThreadPoolExecutor
+import sys
+
+import pytest
+
+from secret_sharing import Configuration, Part
+
+FORMULA = "(XXX & T2(x & y, b | c, d, e)) | (b & c & d & e)"
+
+
+def test_engine():
+    conf = Configuration(modulo=101, formula=FORMULA)
+    engine = conf.engine()
+    conf.formula = "a | b"
+    assert engine.conf.formula == FORMULA
+    assert engine.split(42, seed=0) == Configuration(modulo=101, formula=FORMULA).split(42, seed=0)
+
+
+def test_split_doesnt_modify_arguments():
+    engine = Configuration(modulo=101, formula="a & b & c").engine()
+    assigned = {("a", 1): 17}
+    assert engine.split(42, seed=0, assigned=assigned)[0] == Part("a", [17])
+    assert assigned == {("a", 1): 17}
+
+
+@pytest.fixture
+def switch_often():
+    interval = sys.getswitchinterval()
+    sys.setswitchinterval(1e-6)
+    yield
+    sys.setswitchinterval(interval)
+
+
+def test_concurrent_split_restore(switch_often):
+    names = [f"p{i}" for i in range(40)]
+    engine = Configuration(modulo=2**127 - 1, formula=f"T35({', '.join(names)}) | {FORMULA}").engine()
+
+    def work(secret: int) -> list:
+        parts = engine.split(secret)
+        batch = engine.split_batch([secret, secret + 1])
+        return [
+            engine.restore(parts),
+            engine.restore(parts[5:40]),
+            engine.restore_verified(parts[:39])[0],
+            *engine.restore_batch(batch),
+            *engine.restore_batch([parts[40:], parts[:34]]),
+        ]
+
+    with ThreadPoolExecutor(max_workers=16) as pool:
+        results = list(pool.map(work, range(1, 81)))
+    assert results == [[s, s, s, s, s + 1, s, None] for s in range(1, 81)]
@@ -0,0 +1,38 @@
+import random
+
+import pytest
+
+from secret_sharing import Configuration
+from secret_sharing.field import FIELDS, Field, MersenneField, PseudoMersenneField, field_for, is_probable_prime
+
+
+@pytest.mark.parametrize("field", [MersenneField(127), MersenneField(521), PseudoMersenneField(255, 19)])
+def test_reduce(field):
+    rng = random.Random(0)
+    p = field.modulus
+    xs = [0, 1, p - 1, p, p + 1, 2 * p, p * p, -1, -p - 5]
+    xs += [sum(rng.randrange(p) * rng.randrange(p) for _ in range(20)) for _ in range(50)]
+    assert field.reduce_many(xs) == [x % p for x in xs]
+    assert [field.reduce(x) for x in xs] == [x % p for x in xs]
+
+
+def test_presets():
+    for name, field in FIELDS.items():
+        assert field_for(field.modulus) is field
+        assert Configuration(modulo=name, formula="a & b").modulo == field.modulus
+    conf = Configuration(modulo="mersenne127", formula="T2(a, b, c)")
+    assert conf.restore(conf.split(42)[1:]) == 42
+
+
+def test_modulo_must_be_prime():
+    assert type(field_for(101)) is Field
+    with pytest.raises(ValueError):
+        Configuration(modulo=100, formula="a & b")
+    with pytest.raises(ValueError):
+        Configuration(modulo="mersenne17", formula="a & b")
+
+
+def test_is_probable_prime():
+    assert [n for n in range(30) if is_probable_prime(n)] == [2, 3, 5, 7, 11, 13, 17, 19, 23, 29]
+    assert is_probable_prime(2**127 - 1)
+    assert not is_probable_prime(2**128 + 1)
@@ -1,4 +1,5 @@
 from secret_sharing import Configuration, Part
+from secret_sharing.delta import ChangeKind, ShareDelta, SlotChange
 
 
 def test_add_to_or():
@@ -49,3 +50,34 @@ def test_remove_from_threshold():
     parts = [Part("a", [87]), Part("b", [23]), Part("c", [52]), Part("d", [73])]  # e is 86
     after = before.modify(new, parts, seed=1)
     assert after == [Part("a", [87]), Part("b", [23]), Part("c", [52]), Part("d", [73]), Part("e", [None])]
+
+
+def test_delta_add_to_or():
+    before = Configuration(modulo=101, formula="a | b")
+    new = Configuration(modulo=101, formula="a | b | c", version=2)
+    parts = [Part("a", [42])]
+    delta = before.modify_delta(new, parts, seed=0)
+    # b's value wasn't given, so its holder has to be told it again
+    assert delta.changes == [SlotChange("b", 1, ChangeKind.CHANGED, 42), SlotChange("c", 1, ChangeKind.NEW, 42)]
+    assert delta.unchanged == 1
+    assert delta.version == 2
+
+
+def test_delta_add_to_threshold():
+    before = Configuration(modulo=101, formula="T2(a, b, c)")
+    new = Configuration(modulo=101, formula="T2(a, b, c, d)")
+    parts = [Part("a", [91]), Part("b", [39]), Part("c", [88])]
+    delta = before.modify_delta(new, parts, seed=1)
+    assert delta.changes == [SlotChange("d", 1, ChangeKind.NEW, 36)]
+    assert delta.unchanged == 3
+    assert ShareDelta.deserialize(delta.serialize()) == delta
+
+
+def test_delta_remove_from_threshold():
+    before = Configuration(modulo=101, formula="T3(a, b, c, d, e)")
+    new = Configuration(modulo=101, formula="T3(a, b, c, d)")
+    parts = [Part("a", [87]), Part("b", [23]), Part("c", [52]), Part("d", [73])]
+    delta = before.modify_delta(new, parts, seed=1)
+    assert delta.changes == [SlotChange("e", 1, ChangeKind.REVOKED)]
+    assert delta.by_participant() == {"e": [SlotChange("e", 1, ChangeKind.REVOKED)]}
+    assert delta.apply(parts + [Part("e", [86])]) == parts + [Part("e", [None])]
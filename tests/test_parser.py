@@ -1,3 +1,8 @@
+import copy
+import pickle
+
+import pytest
+
 from secret_sharing.boolean import BooleanNode
 from secret_sharing.parse import parse
 
@@ -43,3 +48,29 @@ def test_complex():
         & (node("b") | node("c"))
         & BooleanNode.thresh(2, node("x") | node("y"), node("q"), node("w") & node("e"))
     )
+
+
+def test_nodes_are_interned():
+    a = parse("(a & b) | T2(a & b, c)")
+    b = parse("(a & b) | T2(a & b, c)")
+    assert a is b
+    assert a.children[0] is a.children[1].children[0]
+    assert hash(a) == hash(b)
+    assert {a: 1}[b] == 1
+    assert parse("a & b") != parse("a | b")
+
+
+def test_nodes_are_immutable():
+    formula = parse("a & b")
+    with pytest.raises(AttributeError):
+        formula._children = ()
+    assert copy.deepcopy(formula) is formula
+    assert pickle.loads(pickle.dumps(formula)) is formula
+
+
+def test_walk_shares_unchanged_subtrees():
+    formula = parse("(a & b) | T2(c, d, e)")
+    assert formula.walk(lambda n: None) is formula
+    renamed = formula.walk(lambda n: node("x") if n == node("c") else None)
+    assert renamed == parse("(a & b) | T2(x, d, e)")
+    assert renamed.children[0] is formula.children[0]
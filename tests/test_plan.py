@@ -0,0 +1,56 @@
+from secret_sharing import Configuration, Part
+from secret_sharing import plan as plan_module
+from secret_sharing.plan import SplitPlan
+
+FORMULA = "(XXX & T2(x & y, b | c, d, e)) | (b & c & d & e)"
+
+
+def test_split_batch():
+    conf = Configuration(modulo=101, formula=FORMULA)
+    batch = conf.split_batch([42, 7, 0], seed=0)
+    assert batch.names == ["XXX", "x", "y", "b", "c", "d", "e"]
+    assert [conf.restore(view) for view in batch][:2] == [42, 7]
+    assert [conf.restore(parts) for parts in batch.to_parts()][:2] == [42, 7]
+    assert conf.restore_batch(batch) == [42, 7, 0]
+
+
+def test_shares_are_linear():
+    conf = Configuration(modulo=101, formula="T2(a, b, c) & d")
+    plan = conf.plan()
+    assert plan.slots == [("a", 1), ("b", 1), ("c", 1), ("d", 1)]
+    # a, b and c lie on a random line through a random value, d is the secret minus that value
+    assert plan.rows == [[(1, 1), (2, 1)], [(1, 1), (2, 2)], [(1, 1), (2, 3)], [(0, 1), (1, 100)]]
+
+
+def test_recombination():
+    plan = Configuration(modulo=101, formula="T2(a, b, c)").plan()
+    assert plan.recombination([("a", 1), ("c", 1)]) == {("a", 1): 52, ("c", 1): 50}
+    assert plan.recombination([("a", 1)]) is None
+
+
+def test_restore_batch_partial():
+    conf = Configuration(modulo=101, formula=FORMULA)
+    parts = conf.split_batch([42], seed=0)[0].parts()
+    xxx, x, y, b, c, d, e = parts
+    assert conf.restore_batch([[xxx, x, y, e], [xxx, x, e], [xxx, c, d], [b, c, d, e]]) == [42, None, 42, 42]
+    assert conf.restore_batch([[Part("b", [None, b.values[1]]), c, d, e]]) == [42]
+
+
+def test_plan_is_memoized():
+    conf = Configuration(modulo=101, formula="T2(a, b, c) & d")
+    plan = conf.plan()
+    assert Configuration(modulo=101, formula="T2(a, b, c) & d").plan() is plan
+    assert Configuration(modulo=101, formula="T2(a, b, c) & d", version=2).plan() is not plan
+    conf.restore_batch(conf.split_batch([1, 2], seed=0))
+    assert plan._recombination
+
+
+def test_recombination_cache_is_bounded(monkeypatch):
+    monkeypatch.setattr(plan_module, "RECOMBINATION_CACHE_SIZE", 4)
+    names = [f"p{chr(97 + i)}" for i in range(6)]
+    plan = SplitPlan(Configuration(modulo=101, formula=f"T2({', '.join(names)})"))
+    for a in names:
+        for b in names:
+            plan.recombination([(a, 1), (b, 1)])
+    assert len(plan._recombination) == 4
+    assert plan.recombination([("pa", 1), ("pb", 1)]) is not None
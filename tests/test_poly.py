@@ -0,0 +1,68 @@
+import random
+
+from secret_sharing.poly import (
+    SubproductTree,
+    interpolate,
+    multipoint_eval,
+    ntt_mul,
+    poly_divmod,
+    poly_eval,
+    poly_mul,
+    rs_decode,
+)
+
+MOD = 2**127 - 1
+
+
+def test_mul_large():
+    rng = random.Random(0)
+    a = [rng.randrange(MOD) for _ in range(100)]
+    b = [rng.randrange(MOD) for _ in range(70)]
+    x = rng.randrange(MOD)
+    assert poly_eval(poly_mul(a, b, MOD), x, MOD) == poly_eval(a, x, MOD) * poly_eval(b, x, MOD) % MOD
+
+
+def test_ntt_mul():
+    mod = 998244353
+    rng = random.Random(0)
+    a = [rng.randrange(mod) for _ in range(300)]
+    b = [rng.randrange(mod) for _ in range(200)]
+    assert ntt_mul(a, b, mod) == poly_mul(a, b, mod)
+
+
+def test_divmod():
+    rng = random.Random(0)
+    a = [rng.randrange(MOD) for _ in range(200)]
+    b = [rng.randrange(MOD) for _ in range(90)]
+    q, r = poly_divmod(a, b, MOD)
+    x = rng.randrange(MOD)
+    assert len(r) < len(b)
+    assert poly_eval(a, x, MOD) == (poly_eval(q, x, MOD) * poly_eval(b, x, MOD) + poly_eval(r, x, MOD)) % MOD
+
+
+def test_multipoint_eval():
+    rng = random.Random(0)
+    poly = [rng.randrange(MOD) for _ in range(150)]
+    xs = [rng.randrange(MOD) for _ in range(300)]
+    assert multipoint_eval(poly, xs, MOD) == [poly_eval(poly, x, MOD) for x in xs]
+
+
+def test_interpolate():
+    rng = random.Random(0)
+    xs = list(range(1, 201))
+    ys = [rng.randrange(MOD) for _ in xs]
+    poly = interpolate(xs, ys, MOD)
+    assert len(poly) <= len(xs)
+    assert SubproductTree(xs, MOD).evaluate(poly) == ys
+
+
+def test_rs_decode():
+    rng = random.Random(0)
+    poly = [rng.randrange(MOD) for _ in range(10)]
+    xs = list(range(1, 31))
+    ys = [poly_eval(poly, x, MOD) for x in xs]
+    for i in rng.sample(range(30), 10):
+        ys[i] = rng.randrange(MOD)
+    assert rs_decode(xs, ys, 10, MOD) == poly
+    ys[xs.index(next(x for x in xs if poly_eval(poly, x, MOD) == ys[x - 1]))] += 1
+    assert rs_decode(xs, ys, 10, MOD) is None
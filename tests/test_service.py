@@ -0,0 +1,99 @@
+import asyncio
+
+import pytest
+
+from secret_sharing import Configuration, Part
+from secret_sharing.service import RESTORE, Histogram, ShareClient, ShareServer
+
+FORMULA = "(XXX & T2(x & y, b | c, d, e)) | (b & c & d & e)"
+
+
+def run(test, **kwargs):
+    async def main():
+        server = ShareServer(**kwargs)
+        await server.start()
+        async with server, ShareClient(port=server.address[1], size=4) as client:
+            return await test(server, client)
+
+    return asyncio.run(main())
+
+
+def test_split_restore():
+    conf = Configuration(modulo=2**127 - 1, formula=FORMULA)
+
+    async def test(server, client):
+        batch = await client.split_batch(conf, [1, 2, 2**126])
+        assert conf.restore_batch(batch) == [1, 2, 2**126]
+        assert await client.restore_batch(conf, batch) == [1, 2, 2**126]
+        assert await client.restore_batch(conf, batch.select(["b", "c"])) == [None] * 3
+        parts = await client.split(conf, 42)
+        assert await client.restore(conf, parts) == 42
+        assert await client.restore(conf, [Part("b", [1, 2])]) is None
+        parts[[part.name for part in parts].index("d")].values[0] = None
+        assert await client.restore(conf, parts) == 42
+
+    run(test)
+
+
+def test_coalescing():
+    conf = Configuration(modulo=101, formula=FORMULA)
+
+    async def test(server, client):
+        batches = await asyncio.gather(*(client.split_batch(conf, [i, i + 1]) for i in range(20)))
+        assert [conf.restore_batch(batch) for batch in batches] == [[i, i + 1] for i in range(20)]
+        restored = await asyncio.gather(*(client.restore_batch(conf, batch) for batch in batches))
+        assert restored == [[i, i + 1] for i in range(20)]
+
+        stats = await client.stats()
+        counters = stats["counters"]
+        assert counters["split.requests"] == counters["restore.requests"] == 20
+        assert counters["split.secrets"] == 40
+        assert counters["split.batches"] < 20
+        assert counters["restore.batches"] < 20
+        assert stats["latency"]["split"]["count"] == 20
+
+    run(test, max_delay=0.05)
+
+
+def test_max_batch():
+    conf = Configuration(modulo=101, formula="a & b")
+
+    async def test(server, client):
+        await asyncio.gather(*(client.split_batch(conf, [i]) for i in range(8)))
+        assert server.metrics.counters["split.batches"] == 4
+
+    run(test, max_batch=2, max_delay=10)
+
+
+def test_errors():
+    async def test(server, client):
+        with pytest.raises(ValueError, match="Expected"):
+            await client.split_batch(Configuration(modulo=101, formula="T2(a"), [1])
+        with pytest.raises(ValueError, match="share batch"):
+            await client._call(RESTORE, Configuration(modulo=101, formula="a"), b"junk")
+        conf = Configuration(modulo=101, formula="a | b")
+        assert await client.restore(conf, await client.split(conf, 5)) == 5
+        assert server.metrics.counters["errors"] == 2
+
+    run(test)
+
+
+def test_unix_socket(tmp_path):
+    conf = Configuration(modulo=101, formula="a & b")
+
+    async def main():
+        server = ShareServer()
+        await server.start(path=str(tmp_path / "s"))
+        async with server, ShareClient(path=str(tmp_path / "s")) as client:
+            return await client.restore(conf, await client.split(conf, 7))
+
+    assert asyncio.run(main()) == 7
+
+
+def test_histogram():
+    hist = Histogram(lowest=1.0, buckets=4)
+    for seconds in [0.5, 1.5, 3, 3, 100]:
+        hist.record(seconds)
+    assert hist.counts == [1, 1, 2, 0, 1]
+    assert hist.quantile(0.5) == 4.0
+    assert hist.quantile(1) is None
@@ -1,4 +1,6 @@
-from secret_sharing import Configuration, Part
+import pytest
+
+from secret_sharing import Configuration, Part, poly
 
 
 def test_split_or():
@@ -86,3 +88,74 @@ def test_restore_partial():
         Part(name="c", values=[86, 33]),
         Part(name="d", values=[82, 65]),
     ])
+
+
+@pytest.mark.parametrize("cutoff", [0, 10**9])
+def test_split_large_threshold(monkeypatch, cutoff):
+    monkeypatch.setattr(poly, "FAST_SPLIT_THRESHOLD", cutoff)
+    monkeypatch.setattr(poly, "FAST_RESTORE_THRESHOLD", cutoff)
+    names = [f"p{i}" for i in range(100)]
+    conf = Configuration(modulo=2**127 - 1, formula=f"T60({', '.join(names)})")
+    splitted = conf.split(42, seed=0)
+    monkeypatch.setattr(poly, "FAST_SPLIT_THRESHOLD", 10**9 - cutoff)
+    assert conf.split(42, seed=0) == splitted
+    assert conf.restore(splitted[:60]) == 42
+    assert conf.restore(splitted[40:]) == 42
+    assert conf.restore(splitted[:59]) is None
+
+
+def test_restore_verified():
+    conf = Configuration(modulo=101, formula="T2(a, b, c, d)")
+    splitted = conf.split(42, seed=0)
+    splitted[1].values[0] += 1
+    assert conf.restore(splitted) != 42
+    assert conf.restore_verified(splitted) == (42, {"b"})
+
+    splitted[2].values[0] += 1
+    assert conf.restore_verified(splitted) == (None, set())
+
+
+def test_restore_verified_nested():
+    conf = Configuration(modulo=101, formula="(XXX & T2(x & y, b | c, d, e)) | (b & c & d & e)")
+    splitted = conf.split(42, seed=0)
+    assert conf.restore_verified(splitted) == (42, set())
+    splitted[1].values[0] += 1
+    assert conf.restore_verified(splitted) == (42, {"x", "y"})
+
+
+def test_split_packed():
+    conf = Configuration(modulo=101, formula="T3(a, b, c, d, e)")
+    splitted = conf.split_packed([42, 7], seed=0)
+    assert [part.name for part in splitted] == ["a", "b", "c", "d", "e"]
+    assert all(len(part.values) == 1 for part in splitted)
+    assert conf.restore_packed(splitted, 2) == [42, 7]
+    assert conf.restore_packed(splitted[2:], 2) == [42, 7]
+    assert conf.restore_packed(splitted[3:], 2) is None
+
+
+def test_split_packed_complex():
+    conf = Configuration(modulo=2**127 - 1, formula="(T3(x & y, b | c, d, f) & T3(d, e, f)) | T4(b, c, d, e)")
+    secrets = [1, 2]
+    splitted = conf.split_packed(secrets, seed=0)
+    assert conf.restore_packed(splitted, 2) == secrets
+    b, c, d, e = (next(part for part in splitted if part.name == name) for name in "bcde")
+    assert conf.restore_packed([b, c, d, e], 2) == secrets
+
+
+def test_split_packed_errors():
+    with pytest.raises(ValueError):
+        Configuration(modulo=101, formula="a & T2(b, c)").split_packed([1])
+    # Every node must keep at least one random value
+    with pytest.raises(ValueError):
+        Configuration(modulo=101, formula="T2(a, b, c)").split_packed([1, 2])
+    with pytest.raises(ValueError):
+        Configuration(modulo=101, formula="T2(a, b, c)").split_packed([])
+
+    # Asking for more secrets than a node can hold would return its random padding
+    conf = Configuration(modulo=101, formula="T3(a, b, c)")
+    splitted = conf.split_packed([5, 6], seed=0)
+    assert conf.restore_packed(splitted, 2) == [5, 6]
+    with pytest.raises(ValueError):
+        conf.restore_packed(splitted, 3)
+    with pytest.raises(ValueError):
+        conf.restore_packed(splitted, 0)
@@ -0,0 +1,83 @@
+import pytest
+
+from secret_sharing import Configuration, Part
+from secret_sharing.vss import Commitments, FixedBase, Group, multi_exp
+
+
+def test_group():
+    group = Group.for_order(101, bits=64)
+    assert group.p.bit_length() == 64
+    assert (group.p - 1) % 101 == 0
+    assert group.g != 1 and pow(group.g, 101, group.p) == 1
+
+
+def test_exponentiation():
+    p = Group.for_order(2**61 - 1, bits=256).p
+    table = FixedBase(3, p, bits=61)
+    assert table.pow(123456789123) == pow(3, 123456789123, p)
+    assert multi_exp([3, 5, 7], [2**60, 12345, 0], p) == pow(3, 2**60, p) * pow(5, 12345, p) % p
+
+
+def test_verify():
+    conf = Configuration(modulo="p25519", formula="(XXX & T2(x & y, b | c, d, e)) | T2(b, c, d)")
+    parts, commitments = conf.split_committed(42, seed=0, bits=512)
+    assert parts == conf.split(42, seed=0)
+    assert len(commitments.nodes) == 2
+    assert commitments.verify(conf, parts) == set()
+
+    commitments = Commitments.deserialize(commitments.serialize())
+    d = parts[5]
+    assert d.name == "d"
+    assert commitments.verify_share(conf, d)
+    assert not commitments.verify_share(conf, Part("d", [d.values[0], d.values[1] + 1]))
+    assert commitments.verify(conf, parts[:5] + [Part("d", [d.values[0] + 1, d.values[1]])]) == {"d"}
+
+
+def test_verify_large():
+    names = [f"p{i}" for i in range(300)]
+    conf = Configuration(modulo="p25519", formula=f"T10({', '.join(names)})")
+    parts, commitments = conf.split_committed(42, seed=0, bits=512)
+    assert commitments.verify(conf, parts) == set()
+    parts[7].values[0] += 1
+    parts[250].values[0] += 1
+    assert commitments.verify(conf, parts) == {"p7", "p250"}
+
+
+def test_invalid_group():
+    with pytest.raises(ValueError):
+        Group(p=23, q=11, g=1)
+    with pytest.raises(ValueError):
+        Group(p=23, q=11, g=5)
+    with pytest.raises(ValueError):
+        Group(p=21, q=5, g=4)
+
+
+def test_dishonest_dealer():
+    conf = Configuration(modulo="p25519", formula="T2(a, b, c)")
+    parts, commitments = conf.split_committed(42, seed=0, bits=512)
+    tampered = [Part(part.name, [(part.values[0] + 2) % conf.modulo]) for part in parts]
+
+    # A group of the wrong order accepts tampered shares
+    small = Commitments(group=Group(p=5, q=2, g=4), nodes=[[4, 4]])
+    with pytest.raises(ValueError, match="wrong order"):
+        small.verify(conf, tampered)
+
+    group = commitments.group
+    with pytest.raises(ValueError, match="threshold nodes"):
+        Commitments(group=group, nodes=[commitments.nodes[0] + [group.g]]).verify(conf, parts)
+    outside = Commitments(group=group, nodes=[[commitments.nodes[0][0], group.p - 1]])
+    with pytest.raises(ValueError, match="outside the group"):
+        outside.verify(conf, parts)
+    data = Commitments.deserialize(commitments.serialize())
+    assert data.verify(conf, tampered) == {"a", "b", "c"}
+
+
+def test_small_modulo():
+    # In a small group anyone can take the discrete logarithm of the commitments
+    conf = Configuration(modulo="mersenne127", formula="T2(a, b, c)")
+    with pytest.raises(ValueError, match="too small"):
+        conf.split_committed(42, seed=0, bits=256)
+    group = Group.for_order(conf.modulo, bits=256)
+    commitments = Commitments(group=group, nodes=[[group.commit(42), group.commit(1)]])
+    with pytest.raises(ValueError, match="too small"):
+        commitments.verify(conf, conf.split(42, seed=0))